@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
 import sys
 import os
 from pathlib import Path
@@ -7,18 +8,78 @@ from pathlib import Path
 from core.project_creator import ProjectCreator
 from core.builder import ProjectBuilder
 from core.runner import ProjectRunner
+from core.test_runner import TestRunner
+from core.workspace import WorkspaceBuilder, WORKSPACE_FILE
+from core.config_parser import ConfigParser
+from core.graph import TargetGraph
+from core.object_cache import parse_size
+from core import daemon
+from core.distributed import serve_worker, DEFAULT_PORT
 
 def main():
     parser = argparse.ArgumentParser(description='Crystxx - Modern C/C++ Build System')
     parser.add_argument('--create', type=str, help='Create new project with given name')
-    parser.add_argument('--build', action='store_true', help='Build the project')
-    parser.add_argument('--run', action='store_true', help='Run the project')
+    parser.add_argument('--build', nargs='*', metavar='TARGET',
+                        help='Build the project (optionally only the given targets and their dependencies); '
+                             'at a workspace root: all member projects (or the given ones)')
+    parser.add_argument('--graph', nargs='?', const='text', choices=['text', 'dot'],
+                        help='Print the target dependency graph as text or Graphviz DOT')
+    parser.add_argument('--compdb', action='store_true',
+                        help='Write compile_commands.json for editor tooling without building')
+    parser.add_argument('--generate', type=str, choices=['ninja'],
+                        help='Generate a build file for another build tool (ninja: build/build.ninja)')
+    parser.add_argument('--no-ninja', action='store_true',
+                        help='Build with crystxx even if a generated build.ninja exists')
+    parser.add_argument('--clean', action='store_true', help='Remove the build tree (of --config PROFILE)')
+    parser.add_argument('--gc', action='store_true',
+                        help='With --clean: only remove orphaned files and least recently used cache entries')
+    parser.add_argument('--max-size', type=str, metavar='SIZE',
+                        help='With --clean --gc: size budget for build/ plus the object cache (e.g. 2G)')
+    parser.add_argument('--run', nargs='?', const='', metavar='EXECUTOR', help='Run the project (optionally a specific executor)')
+    parser.add_argument('--test', nargs='*', metavar='NAME',
+                        help='Build and run CREATE_TEST targets in parallel (all or the given ones)')
+    parser.add_argument('--shard', type=str, metavar='I/N',
+                        help='Run only the I-th of N test shards balanced by recorded test times')
+    parser.add_argument('--timeout', type=float, default=300, metavar='SECONDS',
+                        help='Per-test timeout (default: 300)')
+    parser.add_argument('--bench', type=int, metavar='N', help='With --run: benchmark the executor over N runs')
+    parser.add_argument('--warmup', type=int, default=1, metavar='N',
+                        help='Unmeasured runs before --bench (default: 1)')
+    parser.add_argument('--baseline', type=str, metavar='PROFILE|FILE',
+                        help='Compare --bench with a profile or JSON file (default: the previous result)')
+    parser.add_argument('--threshold', type=float, default=5.0, metavar='PERCENT',
+                        help='Fail --bench if a median grows by more than PERCENT (default: 5)')
     parser.add_argument('--c', action='store_true', help='Create C project')
     parser.add_argument('--cpp', action='store_true', help='Create C++ project')
     parser.add_argument('--gcc', action='store_true', help='Use GCC compiler')
     parser.add_argument('--g++', action='store_true', help='Use G++ compiler')
     parser.add_argument('--clang', action='store_true', help='Use Clang compiler')
     parser.add_argument('--clang++', action='store_true', help='Use Clang++ compiler')
+    parser.add_argument('-j', '--jobs', type=int, help='Number of parallel compile jobs (default: CPU count)')
+    parser.add_argument('-k', '--keep-going', action='store_true', help='Keep building other files after a failure')
+    parser.add_argument('--unity', type=int, nargs='?', const=8, metavar='N',
+                        help='Unity build: compile library sources in batches of N files (0 disables)')
+    parser.add_argument('--profile', type=str, metavar='FILE', help='Write a Chrome trace build profile to FILE')
+    parser.add_argument('--time-trace', action='store_true', help='Merge clang -ftime-trace output into the profile')
+    parser.add_argument('--config', type=str, metavar='PROFILE',
+                        help='Build profile (debug, release, relwithdebinfo or a PROFILE from config.txt)')
+    parser.add_argument('--lto', nargs='?', const='full', choices=['full', 'thin', 'off'],
+                        help='Link-time optimization mode (default: full)')
+    parser.add_argument('--lto-jobs', type=int, metavar='N', help='Parallel LTO jobs at link time')
+    parser.add_argument('--pgo-generate', action='store_true', help='Build an instrumented binary to collect profiles')
+    parser.add_argument('--pgo-use', action='store_true', help='Build using the collected profiles')
+    parser.add_argument('--watch', action='store_true', help='Rebuild the project whenever sources change')
+    parser.add_argument('--daemon', action='store_true', help='Run a build server that keeps the project in memory')
+    parser.add_argument('--stop-daemon', action='store_true', help='Stop the running build server')
+    parser.add_argument('--no-daemon', action='store_true', help='Build locally even if a build server is running')
+    parser.add_argument('--workers', type=str, metavar='HOSTS',
+                        help='Distribute compilation to workers: host:port/slots,... (empty string disables)')
+    parser.add_argument('--worker', action='store_true', help='Run a compile worker for distributed builds')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Worker port (default: {DEFAULT_PORT})')
+    parser.add_argument('--bind', type=str, default='127.0.0.1',
+                        help='Worker listen address (default: 127.0.0.1, use 0.0.0.0 for remote clients)')
+    parser.add_argument('--output', type=str, default='text', choices=['text', 'json'],
+                        help='Diagnostics format: text, or json records on stdout (build log goes to stderr)')
     
     args = parser.parse_args()
     
@@ -35,17 +96,117 @@ def main():
         creator.create_project(args.create, language, compiler)
         print(f"Project '{args.create}' created successfully!")
         
-    elif args.build:
-        builder = ProjectBuilder()
-        if builder.build():
-            print("Build completed successfully!")
+    elif args.build is not None and Path(WORKSPACE_FILE).exists():
+        # Корень рабочей области: все проекты (или перечисленные с их зависимостями) одним пулом задач
+        builder = WorkspaceBuilder(jobs=args.jobs, keep_going=args.keep_going, configuration=args.config,
+                                   projects=args.build or None, output_format=args.output)
+        log = contextlib.redirect_stdout(sys.stderr) if args.output == 'json' else contextlib.nullcontext()
+        with log:
+            success = builder.build()
+            print("Build completed successfully!" if success else "Build failed!")
+        if not success:
+            sys.exit(1)
+    
+    elif args.build is not None:
+        # Запущенный демон отвечает за миллисекунды, если ничего не менялось
+        pgo = "generate" if args.pgo_generate else "use" if args.pgo_use else None
+        workers = args.workers.replace(",", " ").split() if args.workers is not None else None
+        uses_daemon = not (args.no_daemon or args.unity is not None or args.profile or args.lto or pgo
+                           or workers is not None or args.build or args.output == 'json')
+        if uses_daemon:
+            result = daemon.request(Path("build"), "build", {
+                'jobs': args.jobs,
+                'keep_going': args.keep_going,
+                'configuration': args.config
+            })
+            if result is not None:
+                if result:
+                    print("Build completed successfully!")
+                    return
+                print("Build failed!")
+                sys.exit(1)
+        
+        builder = ProjectBuilder(jobs=args.jobs, keep_going=args.keep_going, unity=args.unity,
+                                 profile=args.profile, time_trace=args.time_trace, configuration=args.config,
+                                 lto=args.lto, lto_jobs=args.lto_jobs, pgo=pgo, workers=workers,
+                                 targets=args.build or None, output_format=args.output,
+                                 ninja=not args.no_ninja)
+        # В режиме json stdout занят записями диагностик, остальной вывод идёт в stderr
+        log = contextlib.redirect_stdout(sys.stderr) if args.output == 'json' else contextlib.nullcontext()
+        with log:
+            success = builder.build()
+            print("Build completed successfully!" if success else "Build failed!")
+        if not success:
+            sys.exit(1)
+            
+    elif args.graph:
+        config = ConfigParser(cache_file=Path("build") / ".crystxx_config.json").parse()
+        graph = TargetGraph(config)
+        print(graph.to_dot() if args.graph == 'dot' else graph.to_text())
+        if graph.find_cycles():
+            sys.exit(1)
+    
+    elif args.clean:
+        max_size = parse_size(args.max_size) if args.max_size else None
+        if Path(WORKSPACE_FILE).exists():
+            cleaner = WorkspaceBuilder(configuration=args.config)
         else:
+            cleaner = ProjectBuilder(configuration=args.config)
+        if not cleaner.clean(gc=args.gc, max_size=max_size):
+            sys.exit(1)
+    
+    elif args.generate:
+        builder = ProjectBuilder(configuration=args.config, lto=args.lto, lto_jobs=args.lto_jobs)
+        if not builder.generate_ninja():
+            sys.exit(1)
+            
+    elif args.compdb:
+        if not ProjectBuilder(configuration=args.config).write_compile_commands():
+            sys.exit(1)
+    
+    elif args.watch or args.daemon:
+        builder = ProjectBuilder(jobs=args.jobs, keep_going=args.keep_going, unity=args.unity,
+                                 configuration=args.config)
+        if args.watch:
+            daemon.watch(builder)
+        else:
+            daemon.BuildDaemon(builder).serve()
+    
+    elif args.worker:
+        if not serve_worker(args.bind, args.port, args.jobs):
+            sys.exit(1)
+    
+    elif args.stop_daemon:
+        if daemon.request(Path("build"), "stop") is None:
+            print("No build daemon is running")
+    
+    elif args.test is not None:
+        runner = TestRunner(jobs=args.jobs, configuration=args.config, timeout=args.timeout or None,
+                            shard=args.shard)
+        tests = runner.select(args.test or None)
+        if tests is None:
+            sys.exit(1)
+        if not tests:
+            print("No tests to run")
+            return
+        
+        # Собираем только выбранные тесты (и их библиотеки)
+        builder = ProjectBuilder(jobs=args.jobs, keep_going=args.keep_going, configuration=args.config,
+                                 targets=tests, ninja=not args.no_ninja)
+        if not builder.build():
             print("Build failed!")
             sys.exit(1)
+        if not runner.run(tests):
+            print("Tests failed!")
+            sys.exit(1)
             
-    elif args.run:
-        runner = ProjectRunner()
-        if not runner.run():
+    elif args.run is not None:
+        runner = ProjectRunner(configuration=args.config)
+        if args.bench:
+            if not runner.bench(args.run or None, runs=args.bench, warmup=max(0, args.warmup),
+                                baseline=args.baseline, threshold=args.threshold):
+                sys.exit(1)
+        elif not runner.run(args.run or None):
             print("Run failed!")
             sys.exit(1)
             
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""Бенчмарк crystxx на синтетических проектах: холодная сборка, no-op и правки"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from core.project_creator import ProjectCreator
+from core.builder import ProjectBuilder
+
+# Переменные окружения, которые делают замеры невоспроизводимыми
+ISOLATED_ENV = ("CRYSTXX_CACHE_DIR", "CRYSTXX_CACHE_SIZE", "CRYSTXX_WORKERS")
+
+SCENARIOS = ("cold", "noop", "edit_source", "edit_header")
+
+# Запуск как из командной строки: интерпретатор и импорты - тоже накладные расходы crystxx
+CRYSTXX_COMMAND = [sys.executable, str(Path(__file__).resolve().parent)]
+
+
+@contextlib.contextmanager
+def working_directory(path: Path):
+    """Временно меняет текущую папку (crystxx собирает проект в текущей папке)"""
+    previous_dir = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous_dir)
+
+
+class SyntheticProjectCreator(ProjectCreator):
+    """Создаёт проект заданного размера: N библиотек по M исходников"""
+
+    def __init__(self, libraries: int, sources: int, fan_in: int, depth: int):
+        super().__init__()
+        self.libraries = max(1, libraries)
+        self.sources = max(1, sources)
+        self.fan_in = max(1, fan_in)
+        self.depth = max(1, depth)
+
+    def dependencies(self, index: int) -> List[int]:
+        """Библиотеки образуют цепочки длины depth: lib_i зависит от lib_(i-1)"""
+        return [index - 1] if index % self.depth else []
+
+    def chain_tops(self) -> List[int]:
+        """Последние библиотеки цепочек - от них зависит исполнитель"""
+        return [i for i in range(self.libraries) if i + 1 == self.libraries or (i + 1) % self.depth == 0]
+
+    def create(self, project_dir: Path, compiler: Optional[str] = None):
+        """Генерирует исходники, заголовки и config.txt"""
+        project_dir.parent.mkdir(parents=True, exist_ok=True)
+        with working_directory(project_dir.parent), contextlib.redirect_stdout(io.StringIO()):
+            self.create_project(project_dir.name, "CPP", compiler)
+
+        config_lines = []
+        for lib in range(self.libraries):
+            self._create_library(project_dir, lib)
+            config_lines.append(f"CREATE_LIB lib_{lib} src/lib_{lib}")
+            config_lines.append(f"INCLUDE_LIB lib_{lib} include/lib_{lib}")
+            for dep in self.dependencies(lib):
+                config_lines.append(f"INCLUDE_EXECUTOR lib_{lib} lib_{dep}")
+        for lib in self.chain_tops():
+            config_lines.append(f"INCLUDE_EXECUTOR {project_dir.name} lib_{lib}")
+
+        with open(project_dir / "config.txt", 'a', encoding='utf-8') as f:
+            f.write("\n" + "\n".join(config_lines) + "\n")
+
+        tops = self.chain_tops()
+        main_lines = [f'#include "lib_{lib}_0.h"' for lib in tops]
+        main_lines.append("#include <cstdio>\n")
+        main_lines.append("int main() {")
+        main_lines.append("    int total = 0;")
+        main_lines.extend(f"    total += lib_{lib}_unit_0(1);" for lib in tops)
+        main_lines.append('    std::printf("%d\\n", total);')
+        main_lines.append("    return 0;")
+        main_lines.append("}")
+        (project_dir / "main.cpp").write_text("\n".join(main_lines) + "\n", encoding='utf-8')
+
+    def _create_library(self, project_dir: Path, lib: int):
+        include_dir = project_dir / "include" / f"lib_{lib}"
+        source_dir = project_dir / "src" / f"lib_{lib}"
+        include_dir.mkdir(parents=True, exist_ok=True)
+        source_dir.mkdir(parents=True, exist_ok=True)
+        deps = self.dependencies(lib)
+
+        # Заголовок 0 объявляет функции библиотеки, остальные дают вес препроцессору
+        for header in range(self.fan_in):
+            lines = ["#pragma once"]
+            if header == 0:
+                lines.extend(f'#include "lib_{dep}_0.h"' for dep in deps)
+                lines.extend(f"int lib_{lib}_unit_{unit}(int x);" for unit in range(self.sources))
+            lines.append(f"struct Lib{lib}Header{header} {{")
+            lines.extend(f"    int field_{k} = {k};" for k in range(16))
+            lines.append(f"    inline int sum() const {{ return {' + '.join(f'field_{k}' for k in range(16))}; }}")
+            lines.append("};")
+            (include_dir / f"lib_{lib}_{header}.h").write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+        for unit in range(self.sources):
+            lines = [f'#include "lib_{lib}_{header}.h"' for header in range(self.fan_in)]
+            lines.append(f"int lib_{lib}_unit_{unit}(int x) {{")
+            lines.append(f"    int value = x + {unit};")
+            lines.extend(f"    value += Lib{lib}Header{header}().sum();" for header in range(self.fan_in))
+            lines.extend(f"    value += lib_{dep}_unit_0(x);" for dep in deps)
+            lines.append("    return value;")
+            lines.append("}")
+            (source_dir / f"unit_{unit}.cpp").write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+
+def run_build(jobs: Optional[int]) -> Dict[str, Any]:
+    """Собирает проект в текущей папке и делит время на компилятор и сам crystxx"""
+    builder = ProjectBuilder(jobs=jobs, profile=os.devnull)
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        success = builder.build()
+    wall = time.perf_counter() - start
+    if not success:
+        raise RuntimeError(f"Benchmark build failed:\n{output.getvalue()}")
+
+    profiler = builder.profiler
+    executed = [job for job in profiler.jobs if not job.result.skipped]
+    tool_time = sum(job.result.duration for job in executed)
+    phases = {event['name']: event['dur'] / 1e6 for event in profiler.events if event['cat'] == "phase"}
+    return {
+        'wall': wall,
+        # Время внешних процессов (компилятор, архиватор, линкер)
+        'tool_time': tool_time,
+        # При -j1 всё остальное - собственные накладные расходы crystxx
+        'overhead': max(0.0, wall - tool_time) if (jobs or 1) == 1 else None,
+        'jobs_executed': len(executed),
+        'jobs_skipped': len(profiler.jobs) - len(executed),
+        'phases': phases
+    }
+
+
+def run_cli_build(jobs: Optional[int]) -> float:
+    """Собирает проект отдельным процессом python3 crystxx --build; возвращает полное время"""
+    cmd = CRYSTXX_COMMAND + ["--build", "--no-daemon", "--no-ninja"]
+    if jobs:
+        cmd += ["-j", str(jobs)]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark build failed:\n{result.stdout}")
+    return wall
+
+
+def _with_cli(run: Dict[str, Any], cli_wall: float, jobs: Optional[int]) -> Dict[str, Any]:
+    """Дополняет замер в процессе временем той же сборки через командную строку"""
+    run['cli_wall'] = cli_wall
+    # Время компилятора берётся из замера в процессе - сценарий тот же
+    run['cli_overhead'] = max(0.0, cli_wall - run['tool_time']) if (jobs or 1) == 1 else None
+    return run
+
+
+def _append(path: Path, text: str):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {}
+    for key in ('wall', 'tool_time', 'overhead', 'cli_wall', 'cli_overhead'):
+        values = [run[key] for run in runs if run[key] is not None]
+        summary[key] = statistics.median(values) if values else None
+    summary['jobs_executed'] = runs[-1]['jobs_executed']
+    return summary
+
+
+def benchmark(project_dir: Path, repeat: int, jobs: Optional[int]) -> Dict[str, List[Dict[str, Any]]]:
+    """Прогоняет сценарии cold, noop, edit_source и edit_header в папке проекта: каждый сначала
+    в этом процессе (с разбивкой по фазам), затем повторно через python3 crystxx --build"""
+    results: Dict[str, List[Dict[str, Any]]] = {name: [] for name in SCENARIOS}
+    source_file = project_dir / "src" / "lib_0" / "unit_0.cpp"
+    header_file = project_dir / "include" / "lib_0" / "lib_0_0.h"
+
+    with working_directory(project_dir):
+        for run in range(repeat):
+            shutil.rmtree("build", ignore_errors=True)
+            cold = run_build(jobs)
+            shutil.rmtree("build", ignore_errors=True)
+            results['cold'].append(_with_cli(cold, run_cli_build(jobs), jobs))
+            noop = run_build(jobs)
+            results['noop'].append(_with_cli(noop, run_cli_build(jobs), jobs))
+
+            # Новое содержимое при каждой правке, чтобы исключить любые кэши
+            _append(source_file, f"int bench_source_edit_{run}() {{ return {run}; }}\n")
+            edit_source = run_build(jobs)
+            _append(source_file, f"int bench_source_edit_{run}_cli() {{ return {run}; }}\n")
+            results['edit_source'].append(_with_cli(edit_source, run_cli_build(jobs), jobs))
+
+            _append(header_file, f"inline int bench_header_edit_{run}() {{ return {run}; }}\n")
+            edit_header = run_build(jobs)
+            _append(header_file, f"inline int bench_header_edit_{run}_cli() {{ return {run}; }}\n")
+            results['edit_header'].append(_with_cli(edit_header, run_cli_build(jobs), jobs))
+    return results
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return f"{value:.3f}" if value is not None else "n/a"
+
+
+def print_report(report: Dict[str, Any]):
+    """Таблица медиан: в процессе (без запуска интерпретатора) и через командную строку"""
+    print(f"{'scenario':<12} {'wall, s':>9} {'compiler, s':>12} {'crystxx, s':>11} "
+          f"{'cli wall, s':>12} {'cli crystxx, s':>15} {'jobs':>6}")
+    for name, scenario in report['scenarios'].items():
+        median = scenario['median']
+        print(f"{name:<12} {median['wall']:>9.3f} {median['tool_time']:>12.3f} "
+              f"{_format_seconds(median['overhead']):>11} {_format_seconds(median['cli_wall']):>12} "
+              f"{_format_seconds(median['cli_overhead']):>15} {median['jobs_executed']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crystxx build benchmark on a synthetic project')
+    parser.add_argument('--libraries', type=int, default=4, help='Number of libraries (default: 4)')
+    parser.add_argument('--sources', type=int, default=10, help='Sources per library (default: 10)')
+    parser.add_argument('--fan-in', type=int, default=4, help='Headers included by every source (default: 4)')
+    parser.add_argument('--depth', type=int, default=2, help='Length of library dependency chains (default: 2)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs of every scenario (default: 3)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Parallel jobs; crystxx overhead is only reported for 1 (default: 1)')
+    parser.add_argument('--compiler', type=str, help='Compiler for the generated project (default: g++)')
+    parser.add_argument('--dir', type=str, help='Generate the project here and keep it')
+    parser.add_argument('--output', type=str, metavar='FILE', help='Write JSON results to FILE')
+    args = parser.parse_args()
+
+    for name in ISOLATED_ENV:
+        os.environ.pop(name, None)
+
+    creator = SyntheticProjectCreator(args.libraries, args.sources, args.fan_in, args.depth)
+    work_dir = Path(args.dir) if args.dir else Path(tempfile.mkdtemp(prefix="crystxx-bench-"))
+    project_dir = (work_dir / "bench_project").resolve()
+    try:
+        creator.create(project_dir, args.compiler)
+        results = benchmark(project_dir, max(1, args.repeat), args.jobs)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        if not args.dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'project': {
+            'libraries': creator.libraries,
+            'sources_per_library': creator.sources,
+            'fan_in': creator.fan_in,
+            'depth': creator.depth,
+            'translation_units': creator.libraries * creator.sources + 1
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'compiler': args.compiler or "g++",
+            'jobs': args.jobs
+        },
+        'scenarios': {name: {'median': _summarize(runs), 'runs': runs} for name, runs in results.items()}
+    }
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows: getrusage недоступен, меряется только время
+    resource = None
+
+# Метрики одного запуска: время в секундах, память в КБ
+METRICS = ("wall", "user", "sys", "cpu", "max_rss_kb", "voluntary_switches", "involuntary_switches")
+
+# Метрики, рост которых считается регрессией, и их названия в отчёте
+COMPARED_METRICS = {"wall": "wall", "cpu": "cpu", "max_rss_kb": "max RSS"}
+
+# Период опроса VmHWM запущенной программы
+RSS_POLL_INTERVAL = 0.005
+
+
+class PeakRssSampler(threading.Thread):
+    """Читает VmHWM из /proc/<pid>/status, пока программа не завершится (только Linux)
+
+    ru_maxrss из wait4 не годится: Linux переносит через exec пик RSS процесса,
+    из которого запущен потомок, - то есть самого crystxx. VmHWM принадлежит
+    памяти уже запущенной программы; после выхода она освобождается, поэтому
+    значение опрашивается, и рост в последние миллисекунды перед выходом может не попасть.
+    """
+
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.peak_kb: Optional[int] = None
+        self._done = threading.Event()
+        try:
+            # Открытый файл остаётся привязан к этому процессу, даже если pid потом переиспользуют
+            self._status = open(f"/proc/{pid}/status", 'rb')
+        except OSError:
+            self._status = None
+
+    def run(self):
+        if self._status is None:
+            return
+        with self._status:
+            # Первый замер - через период опроса: сразу после exec VmHWM ещё не отражает программу,
+            # а для более коротких запусков пик памяти не записывается вовсе
+            while not self._done.wait(RSS_POLL_INTERVAL):
+                self._sample()
+
+    def stop(self) -> Optional[int]:
+        """Останавливает опрос и возвращает пик в КБ; None - программа завершилась раньше первого замера"""
+        self._done.set()
+        self.join()
+        return self.peak_kb
+
+    def _sample(self):
+        try:
+            self._status.seek(0)
+            status = self._status.read()
+        except OSError:
+            return
+        for line in status.splitlines():
+            if line.startswith(b"VmHWM:"):
+                self.peak_kb = max(self.peak_kb or 0, int(line.split()[1]))
+                return
+
+
+def measure_run(cmd: List[str]) -> Dict[str, Any]:
+    """Запускает программу один раз; время и getrusage именно этого процесса"""
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if resource is None or not hasattr(os, "wait4"):
+        returncode = process.wait()
+        return {'returncode': returncode, 'wall': time.perf_counter() - start}
+
+    # Пик памяти честно измеряется только через /proc; в остальных системах max_rss_kb не пишется
+    sampler = PeakRssSampler(process.pid) if sys.platform.startswith('linux') else None
+    if sampler:
+        sampler.start()
+    # wait4 возвращает ресурсы завершившегося потомка, а не всех потомков сразу
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    sample = {
+        'returncode': process.returncode,
+        'wall': wall,
+        'user': usage.ru_utime,
+        'sys': usage.ru_stime,
+        'cpu': usage.ru_utime + usage.ru_stime,
+        'voluntary_switches': usage.ru_nvcsw,
+        'involuntary_switches': usage.ru_nivcsw
+    }
+    if sampler:
+        sample['max_rss_kb'] = sampler.stop()
+    return sample
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Среднее, медиана, p95/p99, разброс, минимум и максимум"""
+    if len(values) > 1:
+        percentiles = statistics.quantiles(values, n=100, method='inclusive')
+        p95, p99 = percentiles[94], percentiles[98]
+        variance = statistics.variance(values)
+    else:
+        p95 = p99 = values[0]
+        variance = 0.0
+    return {
+        'mean': statistics.fmean(values),
+        'median': statistics.median(values),
+        'p95': p95,
+        'p99': p99,
+        'stdev': variance ** 0.5,
+        'variance': variance,
+        'min': min(values),
+        'max': max(values)
+    }
+
+
+def summarize_runs(runs: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Статистика по каждой метрике, которую удалось измерить"""
+    summary = {}
+    for metric in METRICS:
+        # None - значение не удалось снять в этом запуске (слишком короткая программа)
+        values = [run[metric] for run in runs if run.get(metric) is not None]
+        if values:
+            summary[metric] = summarize(values)
+    return summary
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Сравнивает медианы с базовым результатом; regression - рост больше threshold процентов"""
+    rows = []
+    for metric in COMPARED_METRICS:
+        if metric not in current['summary'] or metric not in baseline.get('summary', {}):
+            continue
+        new, old = current['summary'][metric]['median'], baseline['summary'][metric]['median']
+        change = (new - old) / old * 100 if old else 0.0
+        rows.append({'metric': metric, 'baseline': old, 'current': new, 'change': change,
+                     'regression': change > threshold})
+    return rows
+
+
+def load_result(path: Path) -> Optional[Dict[str, Any]]:
+    """Загружает сохранённый результат бенчмарка"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_result(path: Path, result: Dict[str, Any]):
+    """Атомарно сохраняет результат бенчмарка"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(path.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp_file, path)
+
+
+def format_value(metric: str, value: float) -> str:
+    if metric == "max_rss_kb":
+        return f"{value / 1024:.1f} MB"
+    if metric.endswith("switches"):
+        return f"{value:.0f}"
+    if value < 1:
+        return f"{value * 1000:.2f} ms"
+    return f"{value:.3f} s"
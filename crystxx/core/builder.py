@@ -1,45 +1,439 @@
 from pathlib import Path
-import subprocess
 import sys
-from typing import List, Dict, Any, Set
+from typing import List, Dict, Any, Optional, Set
 import os
 import glob
+import hashlib
+import contextlib
+import json
+import shutil
+import subprocess
+
+from .config_parser import ConfigParser, PROJECT_LIBRARY_SEPARATOR
+from .state import BuildState, compute_signature, file_stamp
+from .scheduler import Job, JobResult, JobScheduler
+from .depfile import DependencyDatabase, parse_depfile, parse_show_includes, SHOW_INCLUDES_PREFIX
+from .object_cache import ObjectCache, format_size, parse_size, strip_line_markers
+from .graph import TargetGraph
+from .unity import UnityBatcher
+from .toolchain import Toolchain, ToolchainCache
+from .profiler import BuildProfiler
+from .optimization import (OptimizationFlags, lto_flags, lto_archiver, pgo_flags,
+                           merge_clang_profiles, profile_fingerprint)
+from .distributed import WorkerPool, compile_remote
+from .command_line import run_command, run_streaming, split_into_batches
+from .diagnostics import DiagnosticsReporter, JSON_DIAGNOSTICS_FLAG
+from .manifest import BuildManifest, profile_trees, remove_tree, tree_size
+from .ninja import NINJA_FILE, NinjaWriter, command_edge, response_edge, shell_command, write_rules
+
+# Встроенные профили сборки; профиль из config.txt с тем же именем их заменяет
+BUILTIN_PROFILES = {
+    'debug': {'gnu': ["-O0", "-g"], 'msvc': ["/Od", "/Zi"]},
+    'release': {'gnu': ["-O2", "-DNDEBUG"], 'msvc': ["/O2", "/DNDEBUG"]},
+    'relwithdebinfo': {'gnu': ["-O2", "-g", "-DNDEBUG"], 'msvc': ["/O2", "/Zi", "/DNDEBUG"]},
+}
+
+def report_built(jobs: List[Job], target_jobs: List[Job]):
+    """Печатает собранные цели после успешной сборки"""
+    if all(job.result.skipped for job in jobs):
+        print("All targets are up to date")
+        return
+    for job in target_jobs:
+        if not job.result.skipped:
+            print(f"Successfully built: {job.name}")
 
-from .config_parser import ConfigParser
 
 class ProjectBuilder:
-    def __init__(self, config_file: str = "config.txt"):
+    def __init__(self, config_file: str = "config.txt", jobs: Optional[int] = None,
+                 keep_going: bool = False, unity: Optional[int] = None,
+                 profile: Optional[str] = None, time_trace: bool = False,
+                 configuration: Optional[str] = None, lto: Optional[str] = None,
+                 lto_jobs: Optional[int] = None, pgo: Optional[str] = None,
+                 workers: Optional[List[str]] = None, targets: Optional[List[str]] = None,
+                 output_format: str = "text", ninja: bool = True):
         self.config_file = Path(config_file)
-        self.parser = ConfigParser(config_file)
+        # Корень проекта - папка config.txt; в рабочей области это папка участника
+        self.root = self.config_file.parent
+        self.jobs = jobs
+        self.keep_going = keep_going
+        self.unity = unity
+        self.profile = profile
+        self.time_trace = time_trace
+        self.profiler: Optional[BuildProfiler] = None
+        # resident - модель проекта и состояние сборки живут в памяти между
+        # вызовами build() (режим --watch и демон сборки)
+        self.resident = False
+        self._model_loaded = False
+        self._state_loaded = False
+        # Каждый профиль сборки (--config) получает своё дерево build/<профиль>/
+        self.configuration = configuration
+        self.root_build_dir = self.root / "build"
+        self.build_dir = self.root_build_dir / configuration if configuration else self.root_build_dir
+        self.parser = ConfigParser(config_file, cache_file=self.root_build_dir / ".crystxx_config.json")
+        self.flags: List[str] = []
+        # LTO: full/thin/off (None - как в config.txt), PGO: generate/use
+        self.lto = lto
+        self.lto_jobs = lto_jobs
+        self.pgo = pgo
+        self.optimization = OptimizationFlags()
         self.config: Dict[str, Any] = {}
+        self.obj_dir = self.build_dir / "obj"
+        self.lib_dir = self.build_dir / "lib"
+        self.pch_dir = self.build_dir / "pch"
+        self.unity_dir = self.build_dir / "unity"
+        self.test_dir = self.build_dir / "tests"
+        self.unity_batcher: Optional[UnityBatcher] = None
+        # База компиляции для clangd/clang-tidy лежит в корне проекта
+        self.compdb_file = self.root / "compile_commands.json"
+        # build.ninja профиля; если он есть, --build передаёт сборку ninja (ninja=False - не передавать)
+        self.ninja_file = self.build_dir / NINJA_FILE
+        self.ninja = ninja
+        self.state = BuildState(self.build_dir / ".crystxx_state.json")
+        self.deps = DependencyDatabase(self.build_dir / ".crystxx_deps.json")
+        self.manifest = BuildManifest(self.build_dir)
+        # Артефакты текущей сборки, не являющиеся выходами задач (unity-файлы, PCH cl)
+        self._extra_outputs: Set[str] = set()
+        self._stamps: Dict[str, Optional[list]] = {}
+        self.cache: Optional[ObjectCache] = None
+        self.toolchains = ToolchainCache()
+        self.toolchain: Optional[Toolchain] = None
+        # Удалённые воркеры host:port/slots (None - из CRYSTXX_WORKERS или DISTRIBUTE)
+        self.workers = workers
+        self.worker_pool: Optional[WorkerPool] = None
+        # Цели для выборочной сборки (None - все исполнители)
+        self.targets = targets
+        # Рабочая область: библиотеки других проектов ('проект:библиотека' -> задача, include пути,
+        # библиотеки для линковки) и свои библиотеки, которые нужны другим проектам
+        self.imports: Dict[str, Dict[str, Any]] = {}
+        self.exports: Set[str] = set()
+        # Диагностики компилятора: text - как есть, json - поток записей в stdout
+        self.diagnostics = DiagnosticsReporter(output_format)
         
     def build(self) -> bool:
         """Собирает проект"""
+        if self._ninja_available():
+            return self._build_with_ninja()
+        
+        self.profiler = BuildProfiler() if self.profile else None
         try:
-            self.config = self.parser.parse()
-            
-            if not self.parser.validate():
-                print("Invalid configuration!")
+            planned = self.plan("Building project")
+            if not planned:
                 return False
+            jobs, target_jobs, _ = planned
+            return self._run_jobs(jobs, list(target_jobs.values()))
             
-            print(f"Building project: {self.config['project']['name']}")
+        except Exception as e:
+            print(f"Build error: {e}")
+            return False
+        finally:
+            if self.profiler:
+                self.profiler.write(Path(self.profile))
+                self.profiler.print_summary()
+                print(f"Profile written to: {self.profile}")
+    
+    def write_compile_commands(self) -> bool:
+        """Создаёт compile_commands.json из модели проекта, не запуская сборку"""
+        try:
+            project = self._load_project("Generating compilation database for")
+            if not project:
+                return False
+            compiler, targets = project
+            if self._write_compile_commands(compiler, targets):
+                print(f"Compilation database written to: {self.compdb_file}")
+            else:
+                print(f"Compilation database is up to date: {self.compdb_file}")
+            return True
+        except Exception as e:
+            print(f"Build error: {e}")
+            return False
+    
+    def generate_ninja(self) -> bool:
+        """Создаёт build.ninja из модели проекта (crystxx --generate ninja)"""
+        try:
+            project = self._load_project("Generating build.ninja for")
+            if not project:
+                return False
+            compiler, targets = project
+            self._write_ninja(compiler, targets)
+            print(f"Ninja build file written to: {self.ninja_file}")
+            # ninja перегенерирует build.ninja при изменении модели - тогда же обновляется и база компиляции
+            if self.compdb_file.exists():
+                self._write_compile_commands(compiler, targets)
+            return True
+        except Exception as e:
+            print(f"Build error: {e}")
+            return False
+    
+    def _load_project(self, action: str) -> Optional[tuple[str, List[Dict[str, Any]]]]:
+        """Разбирает конфиг, определяет компилятор и флаги, разрешает цели"""
+        if not (self.resident and self._model_loaded):
+            with self._phase("Parse config"):
+                self.config = self.parser.parse()
             
-            # Определяем компилятор
+            if not self.parser.validate():
+                print("Invalid configuration!")
+                return None
+            self._model_loaded = True
+        
+        if self.configuration:
+            print(f"{action}: {self.config['project']['name']} ({self.configuration})")
+        else:
+            print(f"{action}: {self.config['project']['name']}")
+        
+        # Определяем компилятор
+        with self._phase("Detect compiler"):
             compiler = self._get_compiler()
+        
+        # Флаги COMPILER ... FLAG дополняются флагами выбранного профиля
+        self.flags = self.config['compiler']['flags'] + self._profile_flags(compiler)
+        if not self._setup_optimization(compiler):
+            return None
+        
+        # Разрешаем цели сборки с учетом зависимостей
+        with self._phase("Resolve dependencies"):
+            targets = self._resolve_targets()
+        return compiler, targets
+    
+    def _write_compile_commands(self, compiler: str, targets: List[Dict[str, Any]]) -> bool:
+        """Записывает по одной записи на исходник; файл не трогается, если ничего не изменилось"""
+        directory = str(Path.cwd())
+        entries = []
+        for target in targets:
+            common_flags = self._common_flags(compiler, target['include_dirs'])
+            if target['kind'] == 'library' and target['type'] == 'shared' and not self._is_msvc(compiler):
+                common_flags.append("-fPIC")
+            # Инструментам нужен сам заголовок, а не бинарный PCH компилятора
+            header = self.config.get('precompiled_headers', {}).get(target['name'])
+            if header and Path(header).exists():
+                header_path = Path(header).resolve()
+                common_flags += [f"/FI{header_path}"] if self._is_msvc(compiler) else ["-include", str(header_path)]
             
-            # Собираем все исходные файлы с учетом зависимостей
-            source_files, include_dirs = self._resolve_dependencies()
+            # Unity-файлы не попадают в базу: редактору нужны настоящие исходники
+            for source_file in sorted(target['sources']):
+                object_file = self._object_path(target['name'], source_file, compiler)
+                entries.append({
+                    'directory': directory,
+                    'file': str(source_file),
+                    'arguments': self._compile_command(compiler, source_file, object_file, common_flags),
+                    'output': str(object_file)
+                })
+        
+        content = json.dumps(entries, indent=2) + "\n"
+        if self.compdb_file.exists() and self.compdb_file.read_text(encoding='utf-8') == content:
+            return False
+        self.compdb_file.write_text(content, encoding='utf-8')
+        return True
+    
+    def _write_ninja(self, compiler: str, targets: List[Dict[str, Any]]):
+        """Записывает рёбра компиляции, архивации и линковки всех целей теми же командами, что и сборка"""
+        writer = NinjaWriter()
+        writer.comment(f"Generated by crystxx from {self.config_file}, do not edit")
+        writer.variable("ninja_required_version", "1.3")
+        writer.variable("builddir", str(self.build_dir))
+        writer.newline()
+        write_rules(writer, shell_command(self._generator_command()), self._is_msvc(compiler))
+        
+        # Перегенерация при правке config.txt или появлении исходников в папках CREATE_LIB
+        writer.build([self.ninja_file], "regenerate", [self.config_file], implicit=self.parser.scanned_directories())
+        writer.newline()
+        
+        compile_rule = "compile_msvc" if self._is_msvc(compiler) else "compile"
+        outputs: Set[str] = set()
+        target_outputs: Dict[str, Path] = {}
+        for target in targets:
+            if not target['sources']:
+                continue
+            shared = target['kind'] == 'library' and target['type'] == 'shared' and not self._is_msvc(compiler)
+            common_flags = self._common_flags(compiler, target['include_dirs'])
+            if shared:
+                common_flags.append("-fPIC")
             
-            if not source_files:
-                print("No source files found!")
-                return False
+            pch = None
+            header = self.config.get('precompiled_headers', {}).get(target['name'])
+            if header:
+                pch = self._plan_pch(compiler, target['name'], header, common_flags)
+            pch_inputs = []
+            if pch:
+                # cl создаёт .pch попутно с объектом заглушки
+                pch_inputs = [pch['file']]
+                extra = [pch['file']] if pch['object'] else []
+                command_edge(writer, compile_rule, [pch['output']], [pch['source']], pch['command'],
+                             implicit_outputs=extra)
+                outputs.update(str(path) for path in [pch['output'], *extra])
             
-            # Компилируем в монолитный исполняемый файл
-            return self._compile_monolithic(compiler, source_files, include_dirs)
+            # Unity-батчи - оптимизация встроенного планировщика, ninja получает исходные файлы
+            object_files = []
+            for source_file in sorted(target['sources']):
+                object_file = self._object_path(target['name'], source_file, compiler)
+                flags = common_flags + (pch['flags'] if pch else [])
+                cmd = self._compile_command(compiler, source_file, object_file, flags)
+                command_edge(writer, compile_rule, [object_file], [source_file], cmd, implicit=pch_inputs)
+                object_files.append(object_file)
+                outputs.add(str(object_file))
+            if pch and pch['object']:
+                object_files.append(pch['object'])
             
-        except Exception as e:
-            print(f"Build error: {e}")
+            libraries = [target_outputs[dep] for dep in target['dependencies'] if dep in target_outputs]
+            if target['kind'] == 'library':
+                output_file = self._library_path(compiler, dict(target, type='shared' if shared else 'static'))
+                if shared:
+                    command_edge(writer, "link", [output_file], object_files,
+                                 self._shared_library_command(compiler, object_files, output_file))
+                else:
+                    # Одна команда архивации: части не нужны, список объектов уходит в @response файл
+                    cmd = self._archive_commands(compiler, object_files, output_file, batched=False)[0]
+                    if not self._is_msvc(compiler) and os.name != 'nt':
+                        response_edge(writer, "archive_replace", [output_file], object_files, cmd)
+                    else:
+                        command_edge(writer, "archive", [output_file], object_files, cmd)
+            else:
+                output_file = self._executable_path(compiler, target['name'], test=target['kind'] == 'test')
+                command_edge(writer, "link", [output_file], object_files + libraries,
+                             self._link_command(compiler, object_files, output_file, libraries))
+            target_outputs[target['name']] = output_file
+            outputs.add(str(output_file))
+            writer.newline()
+        
+        # Имена целей - для выборочной сборки (ninja core)
+        for name, output_file in target_outputs.items():
+            writer.build([name], "phony", [output_file])
+        writer.default(target_outputs[target['name']] for target in targets
+                       if target['kind'] != 'library' and target['name'] in target_outputs)
+        
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        self.ninja_file.write_text(writer.text(), encoding='utf-8')
+        # Артефакты ninja не должны считаться мусором для --clean --gc
+        self.manifest.load()
+        self.manifest.save(self.manifest.outputs | outputs)
+    
+    def _generator_command(self) -> List[str]:
+        """Команда, которой ninja перегенерирует build.ninja с теми же параметрами"""
+        cmd = [sys.executable, str(Path(__file__).resolve().parent.parent), "--generate", "ninja"]
+        if self.configuration:
+            cmd += ["--config", self.configuration]
+        if self.lto:
+            cmd += [f"--lto={self.lto}"]
+        if self.lto_jobs:
+            cmd += ["--lto-jobs", str(self.lto_jobs)]
+        return cmd
+    
+    def _ninja_available(self) -> bool:
+        """Сборку можно передать ninja: есть build.ninja, ninja установлен и не нужны возможности crystxx"""
+        if not self.ninja or self.resident or not self.ninja_file.exists():
             return False
+        # Unity, профилирование, LTO/PGO из командной строки, воркеры и JSON-диагностики умеет только crystxx
+        if (self.unity is not None or self.profile or self.time_trace or self.lto or self.lto_jobs or self.pgo
+                or self.workers is not None or self.diagnostics.json):
+            return False
+        if shutil.which("ninja") is None:
+            return False
+        try:
+            setting = self._ninja_unsupported_setting()
+        except Exception:
+            # Ошибку конфига покажет встроенная сборка
+            return False
+        if setting:
+            print(f"Note: {setting} is not supported by ninja builds, building with crystxx "
+                  f"(--no-ninja silences this, crystxx --clean removes build.ninja)")
+            return False
+        return True
+    
+    def _ninja_unsupported_setting(self) -> Optional[str]:
+        """Настройка из config.txt или окружения, которую ninja проигнорировал бы (None - таких нет)"""
+        if os.environ.get("CRYSTXX_CACHE_DIR"):
+            return "CRYSTXX_CACHE_DIR"
+        if os.environ.get("CRYSTXX_WORKERS"):
+            return "CRYSTXX_WORKERS"
+        # Модель берётся из кэша - без полного разбора проекта
+        config = self.parser.parse()
+        if config.get('cache', {}).get('dir'):
+            return "CACHE"
+        if config.get('workers'):
+            return "DISTRIBUTE"
+        if config.get('unity', {}).get('batch_size'):
+            return "UNITY"
+        return None
+    
+    def _build_with_ninja(self) -> bool:
+        """Запускает ninja по сгенерированному build.ninja"""
+        cmd = ["ninja", "-f", str(self.ninja_file)]
+        if self.jobs:
+            cmd += ["-j", str(self.jobs)]
+        if self.keep_going:
+            cmd += ["-k", "0"]
+        cmd += self.targets or []
+        print(f"Building with ninja: {self.ninja_file}")
+        return subprocess.run(cmd).returncode == 0
+    
+    def clean(self, gc: bool = False, max_size: Optional[int] = None) -> bool:
+        """Удаляет дерево сборки (--clean) или убирает из него мусор (--clean --gc)"""
+        if not gc:
+            if not self.build_dir.exists():
+                print("Nothing to clean")
+                return True
+            size = tree_size(self.build_dir)
+            remove_tree(self.build_dir)
+            print(f"Removed {self.build_dir} ({format_size(size)})")
+            return True
+        
+        try:
+            self.config = self.parser.parse()
+        except Exception:
+            # Без конфига неизвестен только кэш объектов - дерево сборки всё равно чистим
+            self.config = {}
+        
+        # 1. Файлы в obj/, lib/, pch/, unity/, которых не создала последняя сборка профиля
+        trees = [self.root_build_dir] + [tree for _, tree in profile_trees(self.root_build_dir)]
+        orphans, freed = 0, 0
+        for tree in trees:
+            manifest = BuildManifest(tree)
+            if not manifest.manifest_file.exists():
+                continue
+            manifest.load()
+            count, size = manifest.sweep(("obj", "lib", "pch", "unity"))
+            orphans += count
+            freed += size
+        
+        # 2. Кэш объектов - до его собственного лимита
+        cache_config = self.config.get('cache', {})
+        cache_dir = os.environ.get("CRYSTXX_CACHE_DIR") or cache_config.get('dir')
+        cache = None
+        if cache_dir:
+            cache_size = parse_size(os.environ.get("CRYSTXX_CACHE_SIZE") or cache_config.get('max_size', '5G'))
+            cache = ObjectCache(Path(cache_dir), cache_size)
+            freed += cache.cleanup()
+        
+        # 3. Общий бюджет: вытесняем давно не использованные записи кэша и деревья других профилей
+        evicted = 0
+        if max_size is not None:
+            candidates = list(cache.entries()) if cache else []
+            for mtime, tree in profile_trees(self.root_build_dir):
+                if tree.resolve() != self.build_dir.resolve():
+                    candidates.append((mtime, tree_size(tree), str(tree)))
+            total = tree_size(self.root_build_dir) + (sum(size for _, size, _ in cache.entries()) if cache else 0)
+            for _, size, path in sorted(candidates):
+                if total <= max_size:
+                    break
+                remove_tree(Path(path))
+                total -= size
+                freed += size
+                evicted += 1
+            if total > max_size:
+                print(f"Warning: build files still use {format_size(total)}, budget is {format_size(max_size)}")
+        
+        print(f"Removed {orphans} orphaned file(s), evicted {evicted} least recently used item(s), "
+              f"freed {format_size(freed)}")
+        return True
+    
+    def invalidate_model(self):
+        """Требует заново разобрать config.txt при следующей сборке"""
+        self._model_loaded = False
+    
+    def _phase(self, name: str):
+        """Возвращает контекст замера фазы (пустой, если профилирование выключено)"""
+        if self.profiler:
+            return self.profiler.phase(name)
+        return contextlib.nullcontext()
     
     def _get_compiler(self) -> str:
         """Определяет компилятор для использования"""
@@ -47,6 +441,8 @@ class ProjectBuilder:
         language = self.config['language']['type']
         
         if config_compiler != "auto":
+            # Сведения о компиляторе берутся из пользовательского кэша проверок
+            self.toolchain = self.toolchains.resolve(config_compiler)
             return config_compiler
         
         # Автоопределение
@@ -56,111 +452,870 @@ class ProjectBuilder:
         }
         
         for compiler in compilers[language]:
-            try:
-                subprocess.run([compiler, "--version"], capture_output=True, check=True)
+            toolchain = self.toolchains.resolve(compiler)
+            if toolchain:
+                self.toolchain = toolchain
                 return compiler
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                continue
         
         raise RuntimeError(f"No suitable compiler found for {language}")
     
-    def _resolve_dependencies(self) -> tuple[List[Path], List[Path]]:
-        """Разрешает зависимости и возвращает все исходные файлы и include директории"""
-        all_source_files: Set[Path] = set()
-        all_include_dirs: Set[Path] = set()
+    def _profile_flags(self, compiler: str) -> List[str]:
+        """Возвращает флаги выбранного профиля сборки"""
+        if not self.configuration:
+            return []
+        
+        profiles = self.config.get('profiles', {})
+        if self.configuration in profiles:
+            return profiles[self.configuration]
+        if self.configuration in BUILTIN_PROFILES:
+            family = 'msvc' if self._is_msvc(compiler) else 'gnu'
+            return BUILTIN_PROFILES[self.configuration][family]
+        
+        available = sorted(set(profiles) | set(BUILTIN_PROFILES))
+        raise ValueError(f"Unknown build profile '{self.configuration}', available: {', '.join(available)}")
+    
+    def _setup_optimization(self, compiler: str) -> bool:
+        """Настраивает флаги LTO и PGO для этой сборки"""
+        self.optimization = OptimizationFlags()
+        
+        lto_config = self.config.get('lto', {})
+        lto_mode = self.lto or lto_config.get('mode')
+        if lto_mode and lto_mode != "off":
+            compile_flags, link_flags = lto_flags(compiler, self.toolchain, lto_mode,
+                                                  self.lto_jobs or lto_config.get('jobs'))
+            self.optimization.compile_flags.extend(compile_flags)
+            self.optimization.link_flags.extend(link_flags)
+            if not self._is_msvc(compiler):
+                self.optimization.archiver = lto_archiver(compiler)
+        
+        if not self.pgo:
+            return True
+        if self._is_msvc(compiler):
+            print(f"Warning: PGO workflow is not supported with {compiler}, ignoring --pgo-{self.pgo}")
+            return True
+        
+        # Профили лежат в дереве сборки профиля; путь абсолютный, чтобы
+        # инструментированная программа писала их туда из любого каталога
+        pgo_dir = (self.build_dir / "pgo").resolve()
+        pgo_dir.mkdir(parents=True, exist_ok=True)
+        if self.pgo == "use":
+            if "clang" in Path(compiler).name and not merge_clang_profiles(compiler, pgo_dir):
+                print(f"No profile data in {pgo_dir}, run the --pgo-generate build first")
+                return False
+            if not any(pgo_dir.rglob("*.gcda")) and not any(pgo_dir.glob("*.profdata")):
+                print(f"Warning: no profile data in {pgo_dir}, run the --pgo-generate build first")
+            self.optimization.fingerprint = profile_fingerprint(pgo_dir)
+        
+        compile_flags, link_flags = pgo_flags(compiler, self.pgo, pgo_dir)
+        self.optimization.compile_flags.extend(compile_flags)
+        self.optimization.link_flags.extend(link_flags)
+        return True
+    
+    def _resolve_targets(self) -> List[Dict[str, Any]]:
+        """Разрешает цели: используемые библиотеки в порядке зависимостей, затем исполнители"""
+        graph = TargetGraph(self.config)
+        targets = []
+        
+        cycles = graph.find_cycles()
+        if cycles:
+            raise ValueError(f"Dependency cycle: {' -> '.join(cycles[0])}")
+        
+        # Выбранные цели (--build target...) или все исполнители и тесты - вместе с зависимостями
+        if self.targets:
+            unknown = [name for name in self.targets if name not in graph.edges]
+            if unknown:
+                raise ValueError(f"Unknown target(s): {', '.join(unknown)}, "
+                                 f"available: {', '.join(graph.targets())}")
+            selected = graph.closure(self.targets)
+        else:
+            roots = [executor['name'] for executor in self.config['executors'] + self.config.get('tests', [])]
+            # Проект только из библиотек собирает все свои библиотеки
+            selected = graph.closure(roots or self.config['libraries'])
+            # Библиотеки, которые используют другие проекты рабочей области
+            selected |= graph.closure(name for name in self.exports if name in graph.edges)
+        
+        for name in graph.topological_order():
+            if not graph.is_library(name) or name not in selected:
+                continue
+            library = self.config['libraries'][name]
+            targets.append({
+                'name': name,
+                'kind': 'library',
+                'type': library.get('type', 'static'),
+                'sources': self._existing_files(library.get('source_files', [])),
+                'include_dirs': self._target_include_dirs(graph, name),
+                'dependencies': [dep for dep in graph.transitive_dependencies(name) if graph.is_library(dep)],
+                'imports': self._imported_libraries(graph, name)
+            })
         
-        # Обрабатываем исполнителей и их зависимости
         for executor in self.config['executors']:
-            # Добавляем основной файл исполнителя
-            main_file = Path(executor['main_file'])
-            if main_file.exists():
-                all_source_files.add(main_file.resolve())
-            
-            # Добавляем зависимости исполнителя
-            for lib_name in executor.get('dependencies', []):
-                if lib_name in self.config['libraries']:
-                    lib = self.config['libraries'][lib_name]
-                    self._add_library_files(lib, all_source_files, all_include_dirs)
+            name = executor['name']
+            if name not in selected:
+                continue
+            targets.append({
+                'name': name,
+                'kind': 'executor',
+                'sources': self._existing_files([executor['main_file']]),
+                'include_dirs': self._target_include_dirs(graph, name),
+                'dependencies': [dep for dep in graph.transitive_dependencies(name) if graph.is_library(dep)],
+                'imports': self._imported_libraries(graph, name)
+            })
+        
+        # Тест - исполнитель из нескольких исходников, его бинарник лежит в build/tests
+        for test in self.config.get('tests', []):
+            name = test['name']
+            if name not in selected:
+                continue
+            targets.append({
+                'name': name,
+                'kind': 'test',
+                'sources': self._existing_files(test['source_files']),
+                'include_dirs': self._target_include_dirs(graph, name),
+                'dependencies': [dep for dep in graph.transitive_dependencies(name) if graph.is_library(dep)],
+                'imports': self._imported_libraries(graph, name)
+            })
+        
+        return targets
+    
+    def _imported_libraries(self, graph: TargetGraph, name: str) -> List[str]:
+        """Библиотеки других проектов рабочей области, нужные цели напрямую или через её библиотеки"""
+        imported = []
+        for node in [name] + graph.transitive_dependencies(name):
+            for dep in graph.edges.get(node, []):
+                if PROJECT_LIBRARY_SEPARATOR not in dep or dep in imported:
+                    continue
+                if dep not in self.imports:
+                    raise ValueError(f"Library '{dep}' of target '{node}' belongs to another project, "
+                                     f"build it from the workspace root")
+                imported.append(dep)
+        return imported
+    
+    def _existing_files(self, files: List[str]) -> List[Path]:
+        """Возвращает абсолютные пути существующих файлов"""
+        return [Path(f).resolve() for f in files if Path(f).exists()]
+    
+    def _target_include_dirs(self, graph: TargetGraph, name: str) -> List[Path]:
+        """Собирает include директории цели и всех её зависимостей"""
+        include_dirs: List[Path] = []
+        
+        for lib_name in [name] + graph.transitive_dependencies(name):
+            if not graph.is_library(lib_name):
+                continue
+            for include_dir in self.config['libraries'][lib_name].get('include_dirs', []):
+                include_path = Path(include_dir)
+                if include_path.exists() and include_path.resolve() not in include_dirs:
+                    include_dirs.append(include_path.resolve())
+        
+        # Заголовки библиотек других проектов рабочей области
+        for imported in self._imported_libraries(graph, name):
+            for include_dir in self.imports[imported]['include_dirs']:
+                if include_dir not in include_dirs:
+                    include_dirs.append(include_dir)
         
         # Добавляем include директории из конфига
         for include_path in self.config.get('global_includes', []):
             include_dir = Path(include_path)
-            if include_dir.exists():
-                all_include_dirs.add(include_dir.resolve())
-        
-        return list(all_source_files), list(all_include_dirs)
-    
-    def _add_library_files(self, library: Dict, source_files: Set[Path], include_dirs: Set[Path]):
-        """Рекурсивно добавляет файлы библиотеки и её зависимости"""
-        # Добавляем исходные файлы библиотеки
-        for source_file in library.get('source_files', []):
-            source_path = Path(source_file)
-            if source_path.exists():
-                source_files.add(source_path.resolve())
-        
-        # Добавляем include директории библиотеки
-        for include_dir in library.get('include_dirs', []):
-            include_path = Path(include_dir)
-            if include_path.exists():
-                include_dirs.add(include_path.resolve())
-        
-        # Рекурсивно обрабатываем зависимости
-        for dep_name in library.get('dependencies', []):
-            if dep_name in self.config['libraries']:
-                dep_lib = self.config['libraries'][dep_name]
-                self._add_library_files(dep_lib, source_files, include_dirs)
-    
-    def _compile_monolithic(self, compiler: str, source_files: List[Path], include_dirs: List[Path]) -> bool:
-        """Компилирует все в один исполняемый файл"""
-        build_dir = Path("build")
-        build_dir.mkdir(exist_ok=True)
-        
-        output_file = build_dir / self.config['project']['name']
-        if compiler in ["cl", "clang-cl"] or os.name == 'nt':
-            output_file = output_file.with_suffix(".exe")
+            if include_dir.exists() and include_dir.resolve() not in include_dirs:
+                include_dirs.append(include_dir.resolve())
+        
+        return include_dirs
+    
+    def _is_msvc(self, compiler: str) -> bool:
+        """Проверяет, использует ли компилятор синтаксис MSVC"""
+        return Path(compiler).stem.lower() in ["cl", "clang-cl"]
+    
+    def _object_path(self, target_name: str, source_file: Path, compiler: str) -> Path:
+        """Возвращает путь объектного файла для исходника внутри build/obj/<цель>"""
+        try:
+            relative = source_file.relative_to(self.root.resolve())
+        except ValueError:
+            # Файл вне проекта - кладём его в отдельную папку с хэшем пути
+            digest = hashlib.sha1(str(source_file.parent).encode('utf-8')).hexdigest()[:12]
+            relative = Path("_external") / digest / source_file.name
         
-        # Формируем команду компиляции
-        cmd = [compiler]
+        suffix = ".obj" if self._is_msvc(compiler) else ".o"
+        return self.obj_dir / target_name / relative.parent / (relative.name + suffix)
+    
+    def _library_path(self, compiler: str, target: Dict[str, Any]) -> Path:
+        """Возвращает путь архива или разделяемой библиотеки"""
+        name = target['name']
+        if self._is_msvc(compiler):
+            return self.lib_dir / f"{name}.lib"
+        if target['type'] == 'shared':
+            suffix = ".dylib" if sys.platform == 'darwin' else ".so"
+            return self.lib_dir / f"lib{name}{suffix}"
+        return self.lib_dir / f"lib{name}.a"
+    
+    def _executable_path(self, compiler: str, name: str, test: bool = False) -> Path:
+        """Возвращает путь исполняемого файла (тесты - в build/tests)"""
+        output_file = (self.test_dir if test else self.build_dir) / name
+        if self._is_msvc(compiler) or os.name == 'nt':
+            output_file = output_file.with_suffix(".exe")
+        return output_file
+    
+    def _common_flags(self, compiler: str, include_dirs: List[Path]) -> List[str]:
+        """Формирует флаги стандарта, компиляции и include путей"""
+        flags = []
         
         # Добавляем стандарт
         language = self.config['language']['type']
         standard = self.config['language']['standard']
-        if compiler in ["gcc", "g++", "clang", "clang++"]:
+        if self._is_msvc(compiler):
+            if language == "CPP":
+                flags.append(f"/std:c++{standard}")
+            else:
+                flags.append(f"/std:c{standard}")
+        else:
             std_flag = "-std=c++" if language == "CPP" else "-std=c"
-            cmd.append(f"{std_flag}{standard}")
-        elif compiler in ["cl"]:
-            cmd.append(f"/std:c++{standard}")
+            flags.append(f"{std_flag}{standard}")
         
         # Добавляем флаги компиляции
-        cmd.extend(self.config['compiler']['flags'])
+        flags.extend(self.flags)
+        flags.extend(self.optimization.compile_flags)
         
         # Добавляем include пути
+        include_flag = "/I" if self._is_msvc(compiler) else "-I"
         for include_dir in include_dirs:
-            if compiler in ["gcc", "g++", "clang", "clang++"]:
-                cmd.append(f"-I{include_dir}")
-            elif compiler in ["cl"]:
-                cmd.append(f"/I{include_dir}")
+            flags.append(f"{include_flag}{include_dir}")
+        
+        return flags
+    
+    def _compile_command(self, compiler: str, source_file: Path, object_file: Path,
+                         common_flags: List[str]) -> List[str]:
+        """Формирует команду компиляции одной единицы трансляции"""
+        if self._is_msvc(compiler):
+            return [compiler, "/nologo", "/c", "/showIncludes", *common_flags,
+                    str(source_file), f"/Fo{object_file}"]
+        return [compiler, "-c", "-MD", "-MF", str(self._depfile_path(object_file)), *common_flags,
+                str(source_file), "-o", str(object_file)]
+    
+    def _preprocess_command(self, compiler: str, source_file: Path, object_file: Path,
+                            common_flags: List[str]) -> List[str]:
+        """Формирует команду препроцессора для вычисления ключа кэша"""
+        if self._is_msvc(compiler):
+            return [compiler, "/nologo", "/E", "/showIncludes", *common_flags, str(source_file)]
+        return [compiler, "-E", "-MD", "-MF", str(self._depfile_path(object_file)), *common_flags,
+                str(source_file)]
+    
+    def _depfile_path(self, object_file: Path) -> Path:
+        """Возвращает путь depfile рядом с объектным файлом"""
+        return object_file.with_name(object_file.name + ".d")
+    
+    def _link_command(self, compiler: str, object_files: List[Path], output_file: Path,
+                      libraries: Optional[List[Path]] = None) -> List[str]:
+        """Формирует команду линковки исполняемого файла (библиотеки в порядке зависимостей)"""
+        libraries = libraries or []
+        if self._is_msvc(compiler):
+            return [compiler, "/nologo", *[str(f) for f in object_files + libraries], f"/Fe{output_file}",
+                    *self.optimization.link_flags]
+        
+        cmd = [compiler, *[str(f) for f in object_files + libraries], "-o", str(output_file)]
+        shared_dirs = []
+        for lib in libraries:
+            if lib.suffix in (".so", ".dylib") and lib.parent not in shared_dirs:
+                shared_dirs.append(lib.parent)
+        for lib_dir in shared_dirs:
+            # Разделяемые библиотеки лежат в build/lib (своей или другого проекта) - путь относительно исполняемого файла
+            origin = "@executable_path" if sys.platform == 'darwin' else "$ORIGIN"
+            lib_path = Path(os.path.relpath(lib_dir, output_file.parent)).as_posix()
+            cmd.append(f"-Wl,-rpath,{origin}/{lib_path}")
+        # Флаги вроде -flto и -pthread нужны и на этапе линковки
+        cmd.extend(self.flags)
+        cmd.extend(self.optimization.link_flags)
+        return cmd
+    
+    def _shared_library_command(self, compiler: str, object_files: List[Path], output_file: Path) -> List[str]:
+        """Формирует команду сборки разделяемой библиотеки"""
+        cmd = [compiler, "-shared", *[str(f) for f in object_files], "-o", str(output_file)]
+        # Исполнитель ищет библиотеку по имени через rpath, а не по пути линковки от текущей папки
+        if sys.platform == 'darwin':
+            cmd.append(f"-Wl,-install_name,@rpath/{output_file.name}")
+        else:
+            cmd.append(f"-Wl,-soname,{output_file.name}")
+        cmd.extend(self.flags)
+        cmd.extend(self.optimization.link_flags)
+        return cmd
+    
+    def _archive_commands(self, compiler: str, object_files: List[Path], output_file: Path,
+                          batched: bool = True) -> List[List[str]]:
+        """Формирует команды создания статического архива (длинный список объектов - частями)"""
+        objects = [str(f) for f in object_files]
+        if self._is_msvc(compiler):
+            # Слишком длинную строку lib получит через @response файл
+            return [["lib", "/nologo", f"/OUT:{output_file}", *objects]]
+        
+        archiver = self.optimization.archiver or os.environ.get("AR", "ar")
+        batches = split_into_batches([archiver, "rcs", str(output_file)], objects)
+        if len(batches) == 1 or not batched:
+            return [[archiver, "rcs", str(output_file), *objects]]
+        # Части дописываются в конец архива, индекс символов строится один раз в конце
+        return ([[archiver, "qc", str(output_file), *batches[0]]]
+                + [[archiver, "q", str(output_file), *batch] for batch in batches[1:]]
+                + [[archiver, "s", str(output_file)]])
+    
+    def _response_file(self, output_file: Path) -> Path:
+        """Путь @response файла для команды, создающей output_file"""
+        return output_file.with_name(output_file.name + ".rsp")
+    
+    def _prepare_build(self, compiler: str):
+        """Готовит каталоги и загружает состояние предыдущей сборки"""
+        self.obj_dir.mkdir(parents=True, exist_ok=True)
+        self.lib_dir.mkdir(parents=True, exist_ok=True)
+        if not (self.resident and self._state_loaded):
+            self.state.load()
+            self.deps.load()
+            self._state_loaded = True
+        self._stamps = {}
+        self._extra_outputs = set()
+        self.manifest.load()
+        self.diagnostics.reset()
+        self._setup_cache(compiler)
+        self._setup_workers(compiler)
+        
+        batch_size = self.unity if self.unity is not None else self.config.get('unity', {}).get('batch_size', 0)
+        self.unity_batcher = None
+        if batch_size and batch_size > 0:
+            self.unity_batcher = UnityBatcher(self.unity_dir, batch_size)
+            self.unity_batcher.load()
+    
+    def plan(self, action: str) -> Optional[tuple[List[Job], Dict[str, Job], List[Dict[str, Any]]]]:
+        """Планирует задачи компиляции, архивации и линковки всех целей, не выполняя их"""
+        project = self._load_project(action)
+        if not project:
+            return None
+        compiler, targets = project
+        
+        if not any(target['sources'] for target in targets):
+            print("No source files found!")
+            return None
+        
+        # Уже созданную базу компиляции держим в актуальном состоянии
+        if self.compdb_file.exists() and not self.targets:
+            self._write_compile_commands(compiler, targets)
+        
+        with self._phase("Load build state"):
+            self._prepare_build(compiler)
         
-        # Добавляем исходные файлы
-        cmd.extend([str(f) for f in source_files])
+        # Библиотеки собираются в архивы один раз, исполнители линкуются с ними
+        jobs, target_jobs = self._plan_jobs(compiler, targets)
+        return jobs, target_jobs, targets
+    
+    def _plan_jobs(self, compiler: str, targets: List[Dict[str, Any]]) -> tuple[List[Job], Dict[str, Job]]:
+        """Создаёт задачи всех целей; возвращает все задачи и финальную задачу каждой цели"""
+        jobs: List[Job] = []
+        target_jobs: Dict[str, Job] = {}
+        with self._phase("Plan jobs"):
+            for target in targets:
+                if not target['sources']:
+                    # Библиотека только из заголовков - собирать нечего
+                    continue
+                
+                target_job, compile_jobs = self._plan_target(compiler, target, target_jobs)
+                jobs.extend(compile_jobs)
+                jobs.append(target_job)
+                target_jobs[target['name']] = target_job
+            
+            if self.unity_batcher:
+                self.unity_batcher.save()
+                self._extra_outputs.add(str(self.unity_batcher.state_file))
+        
+        return jobs, target_jobs
+    
+    def _planned_outputs(self, jobs: List[Job]) -> Set[str]:
+        """Все файлы, которые создаёт эта сборка"""
+        outputs = set(self._extra_outputs)
+        for job in jobs:
+            outputs.add(job.name)
+            if job.kind in ("compile", "pch"):
+                outputs.add(str(self._depfile_path(Path(job.name))))
+                if self._time_trace_enabled():
+                    outputs.add(str(Path(job.name).with_suffix(".json")))
+        return outputs
+    
+    def _update_manifest(self, jobs: List[Job], success: bool):
+        """Запоминает артефакты сборки и удаляет осиротевшие после успешной полной сборки"""
+        outputs = self._planned_outputs(jobs)
+        if not success or self.targets:
+            # Выборочная или упавшая сборка не знает про все цели - только дополняем манифест
+            self.manifest.save(self.manifest.outputs | outputs)
+            return
+        
+        # Состояние сборки тоже перечисляет артефакты - так находятся и файлы из сборок до манифеста
+        previous = self.manifest.outputs | set(self.state.entries)
+        removed = self.manifest.prune(previous, outputs)
+        for output in removed:
+            self.state.forget(Path(output))
+            self.deps.forget(Path(output))
+        if removed:
+            print(f"Removed {len(removed)} stale artifact(s)")
+        self.manifest.save(outputs)
+    
+    def _plan_target(self, compiler: str, target: Dict[str, Any],
+                     target_jobs: Dict[str, Job]) -> tuple[Job, List[Job]]:
+        """Создаёт задачи компиляции цели и финальную задачу архивации или линковки"""
+        shared = target['kind'] == 'library' and target['type'] == 'shared'
+        if shared and self._is_msvc(compiler):
+            print(f"Warning: shared libraries are not supported with {compiler}, "
+                  f"building '{target['name']}' as static")
+            shared = False
+            target = dict(target, type='static')
+        
+        common_flags = self._common_flags(compiler, target['include_dirs'])
+        if shared:
+            common_flags.append("-fPIC")
+        if self._time_trace_enabled():
+            common_flags.append("-ftime-trace")
+        
+        # Предкомпилированный заголовок собирается до всех единиц трансляции цели
+        pch = None
+        header = self.config.get('precompiled_headers', {}).get(target['name'])
+        if header:
+            pch = self._plan_pch(compiler, target['name'], header, common_flags)
         
-        # Добавляем выходной файл
-        if compiler in ["gcc", "g++", "clang", "clang++"]:
-            cmd.extend(["-o", str(output_file)])
-        elif compiler in ["cl"]:
-            cmd.extend([f"/Fe{output_file}"])
+        sources = sorted(target['sources'])
+        if self.unity_batcher and target['kind'] == 'library':
+            sources = self._unity_sources(target['name'], sources)
         
-        print(f"Source files: {[str(f) for f in source_files]}")
-        print(f"Include dirs: {[str(f) for f in include_dirs]}")
-        print(f"Compiling with: {' '.join(cmd)}")
+        compile_jobs = [self._compile_job(compiler, target['name'], source_file, common_flags, pch)
+                        for source_file in sources]
+        object_files = [Path(job.name) for job in compile_jobs]
+        if pch:
+            self._extra_outputs.add(str(pch['file']))
+            if pch['object']:
+                object_files.append(pch['object'])
+            compile_jobs.insert(0, pch['job'])
         
-        # Выполняем компиляцию
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        if target['kind'] == 'library':
+            output_file = self._library_path(compiler, target)
+            if shared:
+                cmd = self._shared_library_command(compiler, object_files, output_file)
+                action = lambda job: self._run_link(object_files, output_file, cmd)
+                kind, verb = "link", "Linking"
+            else:
+                commands = self._archive_commands(compiler, object_files, output_file)
+                action = lambda job: self._run_archive(object_files, output_file, commands)
+                kind, verb = "archive", "Archiving"
+            return Job(str(output_file), action, deps=compile_jobs, kind=kind,
+                       description=f"{verb} {output_file}"), compile_jobs
+        
+        # Исполнитель линкуется с архивами зависимостей в порядке графа INCLUDE_EXECUTOR
+        library_jobs = [target_jobs[dep] for dep in target['dependencies'] if dep in target_jobs]
+        library_jobs += self._imported_library_jobs(target)
+        libraries = [Path(job.name) for job in library_jobs]
+        output_file = self._executable_path(compiler, target['name'], test=target['kind'] == 'test')
+        cmd = self._link_command(compiler, object_files, output_file, libraries)
+        return Job(
+            str(output_file),
+            lambda job: self._run_link(object_files + libraries, output_file, cmd),
+            deps=compile_jobs + library_jobs,
+            kind="link",
+            description=f"Linking {output_file}"
+        ), compile_jobs
+    
+    def _imported_library_jobs(self, target: Dict[str, Any]) -> List[Job]:
+        """Задачи библиотек других проектов в порядке линковки (зависимости - после зависимых)"""
+        jobs: List[Job] = []
+        for name in target.get('imports', []):
+            imported = self.imports[name]
+            jobs.extend(job for job in [imported['job']] + imported['libraries'] if job)
+        # Повтор оставляем на последнем месте, чтобы библиотека шла после всех, кто её использует
+        return [job for i, job in enumerate(jobs) if job not in jobs[i + 1:]]
+    
+    def exported_libraries(self, targets: List[Dict[str, Any]], target_jobs: Dict[str, Job]) -> Dict[str, Dict[str, Any]]:
+        """Библиотеки этого проекта для других проектов рабочей области ('проект:библиотека')"""
+        project = self.config['project']['name']
+        exported = {}
+        for target in targets:
+            if target['kind'] != 'library' or target['name'] not in self.exports:
+                continue
+            libraries = [target_jobs[dep] for dep in target['dependencies'] if dep in target_jobs]
+            exported[f"{project}{PROJECT_LIBRARY_SEPARATOR}{target['name']}"] = {
+                # None - библиотека только из заголовков
+                'job': target_jobs.get(target['name']),
+                'include_dirs': target['include_dirs'],
+                'libraries': libraries + self._imported_library_jobs(target)
+            }
+        return exported
+    
+    def _unity_sources(self, target_name: str, sources: List[Path]) -> List[Path]:
+        """Заменяет исходники библиотеки на unity-файлы, оставляя исключённые как есть"""
+        excluded = {Path(f).resolve() for f in self.config.get('unity', {}).get('exclude', [])}
+        batched = [source for source in sources if source not in excluded]
+        standalone = [source for source in sources if source in excluded]
+        
+        extension = ".cpp" if self.config['language']['type'] == "CPP" else ".c"
+        unity_files = self.unity_batcher.write_unity_files(target_name, batched, extension)
+        self._extra_outputs.update(str(unity_file) for unity_file in unity_files)
+        return unity_files + standalone
+    
+    def _time_trace_enabled(self) -> bool:
+        """-ftime-trace включается только при профилировании и поддержке компилятором"""
+        return bool(self.profiler and self.time_trace and self.toolchain
+                    and self.toolchain.supports("-ftime-trace"))
+    
+    def _record_profile(self, jobs: List[Job]):
+        """Передаёт выполненные задачи профилировщику вместе с трассами clang"""
+        self.profiler.record_jobs(jobs)
+        if not self._time_trace_enabled():
+            return
+        
+        for job in jobs:
+            if job.kind == "compile" and job.result and job.result.start is not None and not job.result.skipped:
+                # clang пишет трассу рядом с объектом: foo.cpp.o -> foo.cpp.json
+                self.profiler.merge_time_trace(Path(job.name).with_suffix(".json"), job)
+    
+    def _compile_job(self, compiler: str, target_name: str, source_file: Path,
+                     common_flags: List[str], pch: Optional[Dict[str, Any]] = None) -> Job:
+        """Создаёт задачу компиляции одной единицы трансляции"""
+        object_file = self._object_path(target_name, source_file, compiler)
+        compile_flags = common_flags + (pch['flags'] if pch else [])
+        cmd = self._compile_command(compiler, source_file, object_file, compile_flags)
+        if self.diagnostics.json and self.toolchain and self.toolchain.supports(JSON_DIAGNOSTICS_FLAG):
+            cmd.append(JSON_DIAGNOSTICS_FLAG)
+        
+        preprocess_cmd = None
+        if self.cache or self.worker_pool:
+            # Для ключа кэша и воркеров препроцессируем сам заголовок, а не бинарный PCH
+            preprocess_flags = common_flags + (pch['preprocess_flags'] if pch else [])
+            preprocess_cmd = self._preprocess_command(compiler, source_file, object_file, preprocess_flags)
+        
+        # Флаги, от которых зависит объект (-fPIC, -std, оптимизация): по ним строится ключ кэша,
+        # их же получает воркер. Include пути не нужны - исходник уже препроцессирован
+        remote_flags = [flag for flag in common_flags if not flag.startswith(("-I", "/I"))]
+        
+        # PCH лежит в build/ и не попадает в кэш отметок - добавляем его во входы явно
+        extra_inputs = [str(pch['file'])] if pch else []
+        return Job(
+            str(object_file),
+            lambda job: self._run_compile(source_file, object_file, cmd, preprocess_cmd, extra_inputs,
+                                          remote_flags),
+            deps=[pch['job']] if pch else [],
+            description=f"Compiling {source_file}"
+        )
+    
+    def _plan_pch(self, compiler: str, target_name: str, header: str,
+                  common_flags: List[str]) -> Optional[Dict[str, Any]]:
+        """Создаёт задачу сборки предкомпилированного заголовка цели"""
+        header_path = Path(header)
+        if not header_path.exists():
+            print(f"Warning: precompiled header not found for '{target_name}': {header}")
+            return None
         
+        header_path = header_path.resolve()
+        pch_dir = self.pch_dir / target_name
+        pch_dir.mkdir(parents=True, exist_ok=True)
+        language = self.config['language']['type']
+        stub_object = None
+        
+        if self._is_msvc(compiler):
+            # cl создаёт PCH только при компиляции .cpp файла, включающего заголовок
+            source_file = pch_dir / (header_path.stem + ("_pch.cpp" if language == "CPP" else "_pch.c"))
+            self._write_if_changed(source_file, f'#include "{header_path}"\n')
+            self._extra_outputs.add(str(source_file))
+            pch_file = pch_dir / (header_path.name + ".pch")
+            stub_object = pch_dir / (source_file.name + ".obj")
+            output_file = stub_object
+            cmd = [compiler, "/nologo", "/c", "/showIncludes", *common_flags, f"/Yc{header_path}",
+                   f"/Fp{pch_file}", str(source_file), f"/Fo{stub_object}"]
+            use_flags = [f"/Yu{header_path}", f"/FI{header_path}", f"/Fp{pch_file}"]
+            preprocess_flags = [f"/FI{header_path}"]
+        else:
+            source_file = header_path
+            header_language = "c++-header" if language == "CPP" else "c-header"
+            if "clang" in Path(compiler).name:
+                pch_file = pch_dir / (header_path.name + ".pch")
+                use_flags = ["-include-pch", str(pch_file)]
+            else:
+                # gcc сам находит <header>.gch рядом с путём из -include
+                pch_file = pch_dir / (header_path.name + ".gch")
+                use_flags = ["-Winvalid-pch", "-include", str(pch_dir / header_path.name)]
+            output_file = pch_file
+            cmd = [compiler, "-x", header_language, "-MD", "-MF", str(self._depfile_path(pch_file)),
+                   *common_flags, str(header_path), "-o", str(pch_file)]
+            preprocess_flags = ["-include", str(header_path)]
+        
+        # PCH инвалидируется как обычный объект: по команде (флаги, стандарт) и заголовкам
+        job = Job(
+            str(output_file),
+            lambda job: self._run_compile(source_file, output_file, cmd),
+            kind="pch",
+            description=f"Precompiling {header_path}"
+        )
+        return {
+            'job': job,
+            'command': cmd,
+            'source': source_file,
+            'output': output_file,
+            'file': pch_file,
+            'object': stub_object,
+            'flags': use_flags,
+            'preprocess_flags': preprocess_flags
+        }
+    
+    def _write_if_changed(self, path: Path, content: str):
+        """Перезаписывает сгенерированный файл только при изменении содержимого"""
+        if path.exists() and path.read_text(encoding='utf-8') == content:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+    
+    def _run_jobs(self, jobs: List[Job], target_jobs: List[Job]) -> bool:
+        """Выполняет задачи в пуле и сохраняет состояние сборки"""
+        if self.worker_pool:
+            # Потоков столько, сколько слотов: локальных и на всех воркерах
+            scheduler = JobScheduler(self.worker_pool.local_slots + self.worker_pool.remote_slots,
+                                     self.keep_going)
+            print(f"Using {self.worker_pool.local_slots} local and {self.worker_pool.remote_slots} "
+                  f"remote parallel job(s)")
+        else:
+            scheduler = JobScheduler(self.jobs, self.keep_going)
+            print(f"Using {scheduler.jobs} parallel job(s)")
+        success = False
+        try:
+            success = scheduler.run(jobs)
+        finally:
+            with self._phase("Save build state"):
+                self.save_build(jobs, success)
+            if self.profiler:
+                self._record_profile(jobs)
+        
+        self.diagnostics.finish(success)
+        if success:
+            report_built(jobs, target_jobs)
+        return success
+    
+    def save_build(self, jobs: List[Job], success: bool):
+        """Сохраняет состояние, зависимости и манифест после выполнения задач"""
+        self._update_manifest(jobs, success)
+        self.state.save()
+        self.deps.save()
+        if self.cache:
+            print(self.cache.summary())
+            self.cache.cleanup_if_needed()
+        if self.worker_pool and self.worker_pool.remote_jobs + self.worker_pool.local_jobs:
+            print(self.worker_pool.summary())
+    
+    def _run_compile(self, source_file: Path, object_file: Path, cmd: List[str],
+                     preprocess_cmd: Optional[List[str]] = None,
+                     extra_inputs: Optional[List[str]] = None,
+                     remote_flags: Optional[List[str]] = None) -> JobResult:
+        """Компилирует одну единицу трансляции, если она устарела"""
+        extra_inputs = extra_inputs or []
+        # Объект пересобирается при изменении исходника, любого из его заголовков или команды
+        signature = self._compile_signature(cmd, source_file, self.deps.get(object_file) + extra_inputs)
+        if self.state.is_up_to_date(object_file, signature):
+            return JobResult(True, skipped=True)
+        
+        object_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        preprocessed = None
+        if preprocess_cmd:
+            preprocessed = self._preprocess(object_file, preprocess_cmd)
+        
+        # Перед запуском компилятора ищем готовый объект в общем кэше
+        cache_key = None
+        if self.cache and preprocessed:
+            cache_key = self._cache_key(source_file, preprocessed[0], remote_flags or [])
+            cached_output = self.cache.get(cache_key, object_file)
+            if cached_output is not None:
+                self.deps.update(object_file, preprocessed[1])
+                self.state.record(object_file, self._compile_signature(cmd, source_file,
+                                                                       preprocessed[1] + extra_inputs))
+                return JobResult(True, self.diagnostics.report(str(source_file), cached_output))
+        
+        if self.worker_pool and preprocessed and remote_flags is not None:
+            success, raw_output, output = self._compile_distributed(source_file, object_file, cmd,
+                                                                    preprocessed[0], remote_flags)
+            deps = preprocessed[1]
+        else:
+            returncode, raw_output, output = self._execute(cmd, object_file, str(source_file))
+            deps, raw_output = self._collect_deps(cmd[0], object_file, raw_output)
+            success = returncode == 0
+        
+        if not success:
+            self.state.forget(object_file)
+            self.deps.forget(object_file)
+            return JobResult(False, output)
+        
+        self.deps.update(object_file, deps)
+        self.state.record(object_file, self._compile_signature(cmd, source_file, deps + extra_inputs))
+        if cache_key:
+            # В кэш идёт полный вывод: повторы отбрасываются заново в каждой сборке
+            self.cache.put(cache_key, object_file, raw_output.strip())
+        return JobResult(True, output)
+    
+    def _execute(self, cmd: List[str], output_file: Path, unit: str) -> tuple[int, str, str]:
+        """Запускает инструмент, разбирая диагностики по мере вывода; (код, весь вывод, вывод без повторов)"""
+        stream = self.diagnostics.unit(unit)
+        
+        def on_line(line: str):
+            # Строки /showIncludes - зависимости, а не диагностики
+            if not line.startswith(SHOW_INCLUDES_PREFIX):
+                stream.feed(line)
+        
+        returncode, raw_output = run_streaming(cmd, self._response_file(output_file), on_line)
+        return returncode, raw_output, stream.close()
+    
+    def _compile_distributed(self, source_file: Path, object_file: Path, cmd: List[str], preprocessed: bytes,
+                             remote_flags: List[str]) -> tuple[bool, str, str]:
+        """Компилирует на свободном воркере, а если его нет или он недоступен - локально"""
+        worker = self.worker_pool.acquire()
+        try:
+            if worker:
+                identity = {'version': self.toolchain.version, 'target': self.toolchain.target}
+                try:
+                    success, output = compile_remote(worker, Path(cmd[0]).name, identity,
+                                                     self.config['language']['type'], remote_flags,
+                                                     preprocessed, object_file)
+                    self.worker_pool.count(remote=True)
+                    return success, output, self.diagnostics.report(str(source_file), output)
+                except (OSError, ValueError) as e:
+                    self.worker_pool.mark_down(worker, str(e))
+            
+            returncode, raw_output, output = self._execute(cmd, object_file, str(source_file))
+            self.worker_pool.count(remote=False)
+            return returncode == 0, raw_output, output
+        finally:
+            self.worker_pool.release(worker)
+    
+    def _setup_cache(self, compiler: str):
+        """Включает кэш объектов, если он задан в конфиге или через CRYSTXX_CACHE_DIR"""
+        cache_config = self.config.get('cache', {})
+        cache_dir = os.environ.get("CRYSTXX_CACHE_DIR") or cache_config.get('dir')
+        if not cache_dir:
+            self.cache = None
+            return
+        
+        if not self.toolchain:
+            print(f"Warning: object cache disabled, compiler '{compiler}' not found")
+            self.cache = None
+            return
+        
+        max_size = parse_size(os.environ.get("CRYSTXX_CACHE_SIZE") or cache_config.get('max_size', '5G'))
+        self.cache = ObjectCache(Path(cache_dir), max_size)
+    
+    def _setup_workers(self, compiler: str):
+        """Подключает удалённые воркеры из --workers, CRYSTXX_WORKERS или DISTRIBUTE"""
+        self.worker_pool = None
+        specs = self.workers
+        if specs is None:
+            env_workers = os.environ.get("CRYSTXX_WORKERS")
+            specs = env_workers.replace(",", " ").split() if env_workers else self.config.get('workers', [])
+        if not specs:
+            return
+        
+        if not self.toolchain or self._is_msvc(compiler):
+            print(f"Warning: distributed compilation is not supported with '{compiler}', compiling locally")
+            return
+        if self.pgo or self._time_trace_enabled():
+            # Профили и трассы пишутся компилятором в локальные файлы
+            print("Warning: distributed compilation is disabled with PGO and time traces")
+            return
+        
+        self.worker_pool = WorkerPool(specs, self.jobs or os.cpu_count() or 1)
+    
+    def _preprocess(self, object_file: Path, preprocess_cmd: List[str]) -> Optional[tuple[bytes, List[str]]]:
+        """Препроцессирует исходник локально, возвращает (текст, зависимости)"""
+        result = run_command(preprocess_cmd, self._response_file(object_file), capture_output=True)
         if result.returncode != 0:
-            print("Compilation failed!")
-            print(result.stderr)
-            return False
+            # Ошибку покажет обычная компиляция
+            return None
+        
+        if self._is_msvc(preprocess_cmd[0]):
+            deps, _ = parse_show_includes(result.stderr.decode('utf-8', errors='replace'))
+        else:
+            deps, _ = self._collect_deps(preprocess_cmd[0], object_file, "")
+        return result.stdout, deps
+    
+    def _cache_key(self, source_file: Path, preprocessed: bytes, flags: List[str]) -> str:
+        """Вычисляет ключ кэша по препроцессированному исходнику и флагам компиляции цели"""
+        hasher = hashlib.sha256()
+        hasher.update(strip_line_markers(preprocessed))
+        key_data = {
+            'compiler': [self.toolchain.path, self.toolchain.version, self.toolchain.target],
+            'language': self.config['language'],
+            'flags': flags,
+            'profile_data': self.optimization.fingerprint
+        }
+        # Отладочная информация содержит пути, поэтому такие объекты не делятся между checkout
+        if any(flag.startswith("-g") or flag in ("/Zi", "/Z7") for flag in flags):
+            key_data['source'] = str(source_file)
+        hasher.update(compute_signature(key_data).encode('utf-8'))
+        return hasher.hexdigest()
+    
+    def _compile_signature(self, cmd: List[str], source_file: Path, deps: List[str]) -> str:
+        """Сигнатура объекта: команда плюс отметки исходника и всех его заголовков"""
+        inputs = [str(source_file)]
+        for dep in deps:
+            if dep not in inputs:
+                inputs.append(dep)
+        return compute_signature({
+            # Формат диагностик не влияет на объект
+            'command': [arg for arg in cmd if arg != JSON_DIAGNOSTICS_FLAG],
+            'inputs': [[path, self._stamp(path)] for path in inputs],
+            'profile_data': self.optimization.fingerprint
+        })
+    
+    def _stamp(self, path: str) -> Optional[list]:
+        """Возвращает отметку файла, кэшируя её на время сборки"""
+        # Файлы внутри build/ могут меняться во время сборки - их не кэшируем
+        if os.path.abspath(path).startswith(os.path.abspath(self.build_dir) + os.sep):
+            return file_stamp(Path(path))
+        if path not in self._stamps:
+            self._stamps[path] = file_stamp(Path(path))
+        return self._stamps[path]
+    
+    def _collect_deps(self, compiler: str, object_file: Path, stdout: str) -> tuple[List[str], str]:
+        """Читает зависимости из depfile или вывода /showIncludes"""
+        if self._is_msvc(compiler):
+            return parse_show_includes(stdout)
+        
+        depfile = self._depfile_path(object_file)
+        try:
+            deps = parse_depfile(depfile.read_text(encoding='utf-8'))
+        except OSError:
+            deps = []
+        return deps, stdout
+    
+    def _run_link(self, input_files: List[Path], output_file: Path, cmd: List[str]) -> JobResult:
+        """Линкует объектные файлы и библиотеки, если изменился хотя бы один из них"""
+        signature = compute_signature({
+            'command': cmd,
+            'objects': [file_stamp(f) for f in input_files]
+        })
+        if self.state.is_up_to_date(output_file, signature):
+            return JobResult(True, skipped=True)
+        
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        returncode, _, output = self._execute(cmd, output_file, str(output_file))
+        
+        if returncode != 0:
+            self.state.forget(output_file)
+            return JobResult(False, output)
+        
+        self.state.record(output_file, signature)
+        return JobResult(True, output)
+    
+    def _run_archive(self, object_files: List[Path], output_file: Path, commands: List[List[str]]) -> JobResult:
+        """Пересоздаёт статический архив, если изменился хотя бы один объект"""
+        signature = compute_signature({
+            'command': commands,
+            'objects': [file_stamp(f) for f in object_files]
+        })
+        if self.state.is_up_to_date(output_file, signature):
+            return JobResult(True, skipped=True)
+        
+        # ar дописывает в существующий архив - удаляем его, чтобы не осталось старых объектов
+        if output_file.exists():
+            output_file.unlink()
+        
+        outputs = []
+        for cmd in commands:
+            returncode, _, output = self._execute(cmd, output_file, str(output_file))
+            outputs.append(output)
+            if returncode != 0:
+                self.state.forget(output_file)
+                return JobResult(False, "\n".join(filter(None, outputs)))
         
-        print(f"Successfully built: {output_file}")
-        return True
\ No newline at end of file
+        self.state.record(output_file, signature)
+        return JobResult(True, "\n".join(filter(None, outputs)))
\ No newline at end of file
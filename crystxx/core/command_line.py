@@ -0,0 +1,102 @@
+from pathlib import Path
+from typing import Callable, Iterator, List, Tuple
+import contextlib
+import os
+import subprocess
+
+# Лимит CreateProcess в Windows - 32767 символов
+WINDOWS_COMMAND_LIMIT = 32000
+
+# Инструменты с синтаксисом командной строки MSVC
+MSVC_TOOLS = ("cl", "clang-cl", "lib", "link", "lld-link")
+
+
+def max_command_length() -> int:
+    """Допустимая длина командной строки с запасом под окружение"""
+    override = os.environ.get("CRYSTXX_MAX_COMMAND_LENGTH")
+    if override:
+        return int(override)
+    if os.name == 'nt':
+        return WINDOWS_COMMAND_LIMIT
+    try:
+        arg_max = os.sysconf('SC_ARG_MAX')
+    except (ValueError, OSError, AttributeError):
+        return WINDOWS_COMMAND_LIMIT
+    environment = sum(len(key) + len(value) + 2 for key, value in os.environ.items())
+    return max(WINDOWS_COMMAND_LIMIT, arg_max // 2 - environment)
+
+
+def command_length(cmd: List[str]) -> int:
+    """Длина команды в байтах вместе с разделителями"""
+    return sum(len(os.fsencode(arg)) + 1 for arg in cmd)
+
+
+def _quote(arg: str, msvc: bool) -> str:
+    if msvc:
+        return subprocess.list2cmdline([arg])
+    # gcc, clang и ar понимают кавычки и экранирование обратной косой чертой
+    return '"' + arg.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def response_file_content(cmd: List[str], separator: str = "\n") -> str:
+    """Аргументы команды (без программы) в синтаксисе @response файла её инструмента"""
+    msvc = Path(cmd[0]).stem.lower() in MSVC_TOOLS
+    return separator.join(_quote(arg, msvc) for arg in cmd[1:])
+
+
+def response_file_command(cmd: List[str], response_file: Path) -> List[str]:
+    """Переносит аргументы команды в @response файл"""
+    response_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(response_file, 'w', encoding='utf-8') as f:
+        f.write(response_file_content(cmd) + "\n")
+    return [cmd[0], f"@{response_file}"]
+
+
+@contextlib.contextmanager
+def _fitting_command(cmd: List[str], response_file: Path) -> Iterator[List[str]]:
+    """Возвращает команду как есть или через @response файл, если строка слишком длинная"""
+    if command_length(cmd) <= max_command_length():
+        yield cmd
+        return
+    try:
+        yield response_file_command(cmd, response_file)
+    finally:
+        try:
+            response_file.unlink()
+        except OSError:
+            pass
+
+
+def run_command(cmd: List[str], response_file: Path, **kwargs) -> subprocess.CompletedProcess:
+    """Запускает команду, используя @response файл, если строка слишком длинная"""
+    with _fitting_command(cmd, response_file) as fitting_cmd:
+        return subprocess.run(fitting_cmd, **kwargs)
+
+
+def run_streaming(cmd: List[str], response_file: Path, on_line: Callable[[str], None]) -> Tuple[int, str]:
+    """Запускает команду и передаёт строки stdout/stderr по мере появления; возвращает (код, вывод)"""
+    lines = []
+    with _fitting_command(cmd, response_file) as fitting_cmd:
+        with subprocess.Popen(fitting_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, errors='replace') as process:
+            for line in process.stdout:
+                lines.append(line)
+                on_line(line)
+            returncode = process.wait()
+    return returncode, "".join(lines)
+
+
+def split_into_batches(prefix: List[str], items: List[str]) -> List[List[str]]:
+    """Делит аргументы на группы так, чтобы каждая команда prefix + группа помещалась в лимит"""
+    limit = max_command_length()
+    base = command_length(prefix)
+    batches: List[List[str]] = [[]]
+    length = base
+    for item in items:
+        item_length = command_length([item])
+        if batches[-1] and length + item_length > limit:
+            batches.append([])
+            length = base
+        batches[-1].append(item)
+        length += item_length
+    return batches
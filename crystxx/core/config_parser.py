@@ -1,28 +1,57 @@
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import os
-import glob
+import hashlib
+import json
+
+SOURCE_EXTENSIONS = ('.c', '.cpp', '.cc', '.cxx')
+
+# Версия формата кэша модели проекта - увеличивается при изменении парсера
+MODEL_CACHE_VERSION = 6
+
+# Библиотека другого проекта рабочей области: INCLUDE_EXECUTOR app project:lib
+PROJECT_LIBRARY_SEPARATOR = ":"
 
 class ConfigParser:
-    def __init__(self, config_file: str = "config.txt"):
+    def __init__(self, config_file: str = "config.txt", cache_file: Optional[str] = None):
         self.config_file = Path(config_file)
+        # Пути в конфиге задаются относительно его папки (проект рабочей области)
+        self.root = self.config_file.parent
+        self.cache_file = Path(cache_file) if cache_file else None
         self.config = {}
+        # Отметки путей CREATE_LIB и всех просканированных папок для проверки кэша
+        self._scanned_paths: Dict[str, Any] = {}
         
     def parse(self) -> Dict[str, Any]:
-        """Парсит config.txt файл"""
+        """Парсит config.txt файл (или берёт готовую модель из кэша)"""
         if not self.config_file.exists():
             raise FileNotFoundError(f"Config file {self.config_file} not found")
         
-        with open(self.config_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        content = self.config_file.read_bytes()
+        config_hash = hashlib.sha1(content).hexdigest()
+        
+        cached = self._load_cached_model(config_hash)
+        if cached is not None:
+            self.config = cached
+            return self.config
+        
+        lines = content.decode('utf-8').splitlines()
+        self._scanned_paths = {}
         
         self.config = {
             'project': {'name': '', 'version': '1.0.0'},
             'language': {'type': 'CPP', 'standard': '20'},
             'compiler': {'name': 'auto', 'flags': []},
             'executors': [],
+            'tests': [],
             'libraries': {},
-            'global_includes': []
+            'global_includes': [],
+            'cache': {'dir': None, 'max_size': '5G'},
+            'precompiled_headers': {},
+            'unity': {'batch_size': 0, 'exclude': []},
+            'profiles': {},
+            'lto': {'mode': None, 'jobs': None},
+            'workers': []
         }
         
         for line in lines:
@@ -32,8 +61,73 @@ class ConfigParser:
                 
             self._parse_line(line)
         
+        self._save_cached_model(config_hash)
         return self.config
     
+    def _load_cached_model(self, config_hash: str) -> Optional[Dict[str, Any]]:
+        """Возвращает сохранённую модель проекта, если конфиг и папки не менялись"""
+        if not self.cache_file:
+            return None
+        
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if cached.get('version') != MODEL_CACHE_VERSION or cached.get('config_hash') != config_hash:
+            return None
+        # Пути модели построены относительно текущей папки
+        if cached.get('cwd') != os.getcwd():
+            return None
+        
+        # Новый или удалённый файл меняет mtime своей папки
+        for path, stamp in cached.get('scanned_paths', {}).items():
+            if self._path_stamp(path) != stamp:
+                return None
+        
+        self._scanned_paths = cached['scanned_paths']
+        return cached['config']
+    
+    def _save_cached_model(self, config_hash: str):
+        """Сохраняет модель проекта вместе с отметками просканированных путей"""
+        if not self.cache_file:
+            return
+        
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(self.cache_file.name + '.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': MODEL_CACHE_VERSION,
+                    'config_hash': config_hash,
+                    'cwd': os.getcwd(),
+                    'scanned_paths': self._scanned_paths,
+                    'config': self.config
+                }, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            # Кэш - только ускорение, без него всё работает
+            pass
+    
+    def scanned_directories(self) -> List[str]:
+        """Папки, просканированные CREATE_LIB: новый исходник в них меняет модель проекта"""
+        return sorted(path for path in self._scanned_paths if os.path.isdir(path))
+    
+    def _path(self, path: str) -> str:
+        """Переводит путь из конфига в путь относительно текущей папки"""
+        return str(self.root / path)
+    
+    def _path_stamp(self, path: str) -> Any:
+        """Отметка пути: mtime для папки, 'file' для файла, None если пути нет"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if os.path.isdir(path):
+            return stat.st_mtime_ns
+        return 'file'
+    
     def _parse_line(self, line: str):
         """Парсит одну строку конфига"""
         parts = line.split()
@@ -50,12 +144,28 @@ class ConfigParser:
             self._parse_compiler(parts[1:])
         elif command == "CREATE_EXECUTOR":
             self._parse_create_executor(parts[1:])
+        elif command == "CREATE_TEST":
+            self._parse_create_test(parts[1:])
         elif command == "CREATE_LIB":
             self._parse_create_lib(parts[1:])
         elif command == "INCLUDE_LIB":
             self._parse_include_lib(parts[1:])
         elif command == "INCLUDE_EXECUTOR":
             self._parse_include_executor(parts[1:])
+        elif command == "CACHE":
+            self._parse_cache(parts[1:])
+        elif command == "PRECOMPILE":
+            self._parse_precompile(parts[1:])
+        elif command == "PROFILE":
+            self._parse_profile(parts[1:])
+        elif command == "LTO":
+            self._parse_lto(parts[1:])
+        elif command == "DISTRIBUTE":
+            self.config['workers'].extend(parts[1:])
+        elif command == "UNITY":
+            self._parse_unity(parts[1:])
+        elif command == "UNITY_EXCLUDE":
+            self.config['unity']['exclude'].extend(self._path(part) for part in parts[1:])
     
     def _parse_project(self, parts: List[str]):
         """Парсит PROJECT команду"""
@@ -102,21 +212,38 @@ class ConfigParser:
         if len(parts) >= 2:
             self.config['executors'].append({
                 'name': parts[0],
-                'main_file': parts[1],
+                'main_file': self._path(parts[1]),
+                'dependencies': []
+            })
+    
+    def _parse_create_test(self, parts: List[str]):
+        """Парсит CREATE_TEST команду: CREATE_TEST name source|dir..."""
+        if len(parts) >= 2:
+            source_files = []
+            for source_path in parts[1:]:
+                for source_file in self._find_source_files(self._path(source_path)):
+                    if source_file not in source_files:
+                        source_files.append(source_file)
+            
+            self.config['tests'].append({
+                'name': parts[0],
+                'source_files': source_files,
                 'dependencies': []
             })
     
     def _parse_create_lib(self, parts: List[str]):
-        """Парсит CREATE_LIB команду - теперь поддерживает папки"""
+        """Парсит CREATE_LIB команду: CREATE_LIB name path [STATIC|SHARED]"""
         if len(parts) >= 2:
             lib_name = parts[0]
-            source_path = parts[1]
+            source_path = self._path(parts[1])
+            lib_type = 'shared' if any(part.upper() == "SHARED" for part in parts[2:]) else 'static'
             
             # Находим все исходные файлы
             source_files = self._find_source_files(source_path)
             
             self.config['libraries'][lib_name] = {
                 'name': lib_name,
+                'type': lib_type,
                 'source_files': source_files,
                 'include_dirs': [],
                 'dependencies': []
@@ -126,19 +253,34 @@ class ConfigParser:
         """Находит все исходные файлы по пути (файл или папка)"""
         path_obj = Path(path)
         source_files = []
+        self._scanned_paths[path] = self._path_stamp(path)
         
         if path_obj.is_file():
             # Если это файл - просто возвращаем его
             source_files.append(str(path_obj))
         elif path_obj.is_dir():
-            # Если это папка - ищем все .c/.cpp файлы рекурсивно
-            extensions = ['.c', '.cpp', '.cc', '.cxx']
-            for ext in extensions:
-                pattern = f"{path}/**/*{ext}"
-                source_files.extend([str(Path(f)) for f in glob.glob(pattern, recursive=True)])
+            # Если это папка - один рекурсивный обход для всех расширений
+            self._scan_directory(path, source_files)
         
         return source_files
     
+    def _scan_directory(self, path: str, source_files: List[str]):
+        """Рекурсивно собирает .c/.cpp файлы папки и запоминает mtime каждой подпапки"""
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        
+        for entry in entries:
+            # Как и glob, пропускаем скрытые файлы и папки
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                self._scanned_paths[entry.path] = self._path_stamp(entry.path)
+                self._scan_directory(entry.path, source_files)
+            elif entry.name.endswith(SOURCE_EXTENSIONS) and entry.is_file():
+                source_files.append(str(Path(entry.path)))
+    
     def _parse_include_lib(self, parts: List[str]):
         """Парсит INCLUDE_LIB команду - теперь для конкретных библиотек"""
         if len(parts) < 2:
@@ -166,7 +308,7 @@ class ConfigParser:
         # Добавляем include пути к указанным библиотекам
         for lib_name in lib_names:
             if lib_name in self.config['libraries']:
-                self.config['libraries'][lib_name]['include_dirs'].append(include_path)
+                self.config['libraries'][lib_name]['include_dirs'].append(self._path(include_path))
     
     def _parse_include_executor(self, parts: List[str]):
         """Парсит INCLUDE_EXECUTOR команду"""
@@ -174,8 +316,8 @@ class ConfigParser:
             target_name = parts[0]
             lib_name = parts[1]
             
-            # Ищем в исполнителях
-            for executor in self.config['executors']:
+            # Ищем в исполнителях и тестах
+            for executor in self.config['executors'] + self.config['tests']:
                 if executor['name'] == target_name:
                     executor['dependencies'].append(lib_name)
                     return
@@ -186,23 +328,81 @@ class ConfigParser:
                     lib['dependencies'].append(lib_name)
                     return
     
+    def _parse_cache(self, parts: List[str]):
+        """Парсит CACHE команду: CACHE path [MAX_SIZE size]"""
+        i = 0
+        while i < len(parts):
+            if parts[i].upper() == "MAX_SIZE" and i + 1 < len(parts):
+                self.config['cache']['max_size'] = parts[i + 1]
+                i += 1
+            else:
+                self.config['cache']['dir'] = self._path(parts[i])
+            i += 1
+    
+    def _parse_precompile(self, parts: List[str]):
+        """Парсит PRECOMPILE команду: PRECOMPILE target header"""
+        if len(parts) >= 2:
+            self.config['precompiled_headers'][parts[0]] = self._path(parts[1])
+    
+    def _parse_profile(self, parts: List[str]):
+        """Парсит PROFILE команду: PROFILE name FLAG flag1 FLAG flag2..."""
+        if not parts:
+            return
+        
+        flags = self.config['profiles'].setdefault(parts[0], [])
+        flags.extend(part for part in parts[1:] if part.upper() != "FLAG")
+    
+    def _parse_lto(self, parts: List[str]):
+        """Парсит LTO команду: LTO [FULL|THIN|OFF] [JOBS n]"""
+        mode = "full"
+        i = 0
+        while i < len(parts):
+            if parts[i].upper() == "JOBS" and i + 1 < len(parts):
+                self.config['lto']['jobs'] = int(parts[i + 1])
+                i += 1
+            elif parts[i].upper() in ("FULL", "THIN", "OFF"):
+                mode = parts[i].lower()
+            i += 1
+        self.config['lto']['mode'] = None if mode == "off" else mode
+    
+    def _parse_unity(self, parts: List[str]):
+        """Парсит UNITY команду: UNITY [batch_size]"""
+        batch_size = 8
+        if parts:
+            if parts[0].upper() == "OFF":
+                batch_size = 0
+            else:
+                batch_size = int(parts[0])
+        self.config['unity']['batch_size'] = batch_size
+    
     def validate(self) -> bool:
         """Проверяет валидность конфигурации"""
         if not self.config['project']['name']:
             return False
             
-        if not self.config['executors']:
+        # Проект только из библиотек имеет смысл - их используют другие проекты рабочей области
+        if not self.config['executors'] and not self.config['libraries']:
             return False
             
         # Проверяем что все зависимости существуют
         for executor in self.config['executors']:
             for dep in executor.get('dependencies', []):
-                if dep not in self.config['libraries']:
+                if dep not in self.config['libraries'] and PROJECT_LIBRARY_SEPARATOR not in dep:
                     print(f"Warning: Executor '{executor['name']}' depends on unknown library '{dep}'")
         
+        for test in self.config['tests']:
+            for dep in test.get('dependencies', []):
+                if dep not in self.config['libraries'] and PROJECT_LIBRARY_SEPARATOR not in dep:
+                    print(f"Warning: Test '{test['name']}' depends on unknown library '{dep}'")
+        
         for lib_name, library in self.config['libraries'].items():
             for dep in library.get('dependencies', []):
-                if dep not in self.config['libraries']:
+                if dep not in self.config['libraries'] and PROJECT_LIBRARY_SEPARATOR not in dep:
                     print(f"Warning: Library '{lib_name}' depends on unknown library '{dep}'")
+        
+        executor_names = [executor['name'] for executor in self.config['executors'] + self.config['tests']]
+        for target in self.config['precompiled_headers']:
+            if target not in executor_names and target not in self.config['libraries']:
+                print(f"Warning: PRECOMPILE refers to unknown target '{target}'")
             
         return True
\ No newline at end of file
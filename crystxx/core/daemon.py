@@ -0,0 +1,252 @@
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, Any, Optional
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+
+from .builder import ProjectBuilder
+from .watcher import create_watcher
+
+ADDRESS_FILE = ".crystxx_daemon.json"
+SOCKET_FILE = ".crystxx.sock"
+
+# Пауза для группировки серии сохранений в одну пересборку
+DEBOUNCE_SECONDS = 0.1
+
+
+class _SocketWriter:
+    """Поток вывода, пересылающий напечатанное клиенту построчно"""
+
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self._buffer = ""
+
+    def write(self, text: str) -> int:
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            _send(self.connection, {'output': line})
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            _send(self.connection, {'output': self._buffer})
+            self._buffer = ""
+
+
+def _send(connection: socket.socket, message: Dict[str, Any]):
+    try:
+        connection.sendall((json.dumps(message) + "\n").encode('utf-8'))
+    except OSError:
+        # Клиент отключился - сборка всё равно доводится до конца
+        pass
+
+
+def _watch_roots(builder: ProjectBuilder):
+    """Папки для наблюдения: проект и внешние include директории"""
+    roots = [Path.cwd()]
+    for library in builder.config.get('libraries', {}).values():
+        for include_dir in library.get('include_dirs', []):
+            path = Path(include_dir).resolve()
+            if Path.cwd() not in path.parents and path != Path.cwd():
+                roots.append(path)
+    return roots
+
+
+def _needs_new_model(changes, config_file: Path) -> bool:
+    """Новые/удалённые файлы и правка конфига требуют заново разобрать проект"""
+    config_file = config_file.resolve()
+    return any(kind != "modified" or path == config_file for kind, path in changes)
+
+
+def watch(builder: ProjectBuilder) -> bool:
+    """Пересобирает проект при каждом сохранении файлов (crystxx --watch)"""
+    builder.resident = True
+    success = builder.build()
+    watcher = create_watcher(_watch_roots(builder), builder.config_file, [builder.root_build_dir])
+    print(f"Watching for changes ({type(watcher).__name__}), press Ctrl+C to stop")
+
+    try:
+        while True:
+            changes = watcher.wait()
+            time.sleep(DEBOUNCE_SECONDS)
+            changes += watcher.wait(0)
+            if not changes:
+                continue
+
+            if _needs_new_model(changes, builder.config_file):
+                builder.invalidate_model()
+            print(f"Detected {len(changes)} change(s), rebuilding...")
+            success = builder.build()
+            print("Build completed successfully!" if success else "Build failed!")
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        watcher.close()
+    return success
+
+
+class BuildDaemon:
+    """Фоновый сервер сборки: держит модель проекта в памяти и отвечает по локальному сокету"""
+
+    def __init__(self, builder: ProjectBuilder):
+        self.builder = builder
+        self.builder.resident = True
+        self.address_file = builder.root_build_dir / ADDRESS_FILE
+        self.token = secrets.token_hex(16)
+        self.dirty = True
+        self.last_success = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._server: Optional[socket.socket] = None
+
+    def serve(self):
+        """Запускает сервер и блокируется до команды stop или Ctrl+C"""
+        self._run_build()
+        watcher = create_watcher(_watch_roots(self.builder), self.builder.config_file,
+                                 [self.builder.root_build_dir])
+        threading.Thread(target=self._watch_loop, args=(watcher,), daemon=True).start()
+
+        self._server = self._listen()
+        print(f"Build daemon listening ({type(watcher).__name__}), press Ctrl+C to stop")
+        try:
+            while not self._stopping.is_set():
+                try:
+                    connection, _ = self._server.accept()
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._shutdown()
+            watcher.close()
+
+    def _listen(self) -> socket.socket:
+        """Открывает Unix-сокет в build/ (или TCP на localhost, где его нет)"""
+        self.builder.root_build_dir.mkdir(parents=True, exist_ok=True)
+        if hasattr(socket, 'AF_UNIX'):
+            socket_path = self.builder.root_build_dir / SOCKET_FILE
+            if socket_path.exists():
+                socket_path.unlink()
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(str(socket_path))
+            address = {'family': 'unix', 'path': str(socket_path)}
+        else:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.bind(("127.0.0.1", 0))
+            address = {'family': 'tcp', 'port': server.getsockname()[1]}
+
+        server.listen()
+        server.settimeout(0.5)
+        address.update({'pid': os.getpid(), 'token': self.token})
+        with open(self.address_file, 'w', encoding='utf-8') as f:
+            json.dump(address, f)
+        return server
+
+    def _shutdown(self):
+        if self._server:
+            self._server.close()
+        for name in (ADDRESS_FILE, SOCKET_FILE):
+            try:
+                (self.builder.root_build_dir / name).unlink()
+            except OSError:
+                pass
+
+    def _watch_loop(self, watcher):
+        """Помечает проект изменённым при сохранении файлов"""
+        while not self._stopping.is_set():
+            changes = watcher.wait(0.5)
+            if not changes:
+                continue
+            with self._lock:
+                self.dirty = True
+                if _needs_new_model(changes, self.builder.config_file):
+                    self.builder.invalidate_model()
+
+    def _handle(self, connection: socket.socket):
+        """Обрабатывает один запрос клиента"""
+        with connection:
+            try:
+                request = json.loads(connection.makefile('r', encoding='utf-8').readline())
+            except (OSError, ValueError):
+                return
+            if request.get('token') != self.token:
+                _send(connection, {'output': "Invalid daemon token", 'success': False})
+                return
+
+            command = request.get('command')
+            if command == "stop":
+                self._stopping.set()
+                _send(connection, {'output': "Build daemon stopped", 'success': True})
+            elif command == "build" and request.get('configuration') != self.builder.configuration:
+                # Демон обслуживает только свой профиль - клиент соберёт сам
+                _send(connection, {'unavailable': True})
+            elif command == "build":
+                self.builder.jobs = request.get('jobs') or self.builder.jobs
+                self.builder.keep_going = request.get('keep_going', self.builder.keep_going)
+                writer = _SocketWriter(connection)
+                success = self._run_build(writer)
+                writer.flush()
+                _send(connection, {'success': success})
+            else:
+                _send(connection, {'output': f"Unknown command: {command}", 'success': False})
+
+    def _run_build(self, writer: Optional[_SocketWriter] = None) -> bool:
+        """Пересобирает проект, если с прошлой успешной сборки что-то изменилось"""
+        with self._build_lock:
+            with self._lock:
+                if not self.dirty and self.last_success:
+                    if writer:
+                        print("No changes since last build, everything is up to date", file=writer)
+                    return True
+                # Изменения, пришедшие во время сборки, снова пометят проект
+                self.dirty = False
+
+            if writer:
+                with redirect_stdout(writer):
+                    success = self.builder.build()
+            else:
+                success = self.builder.build()
+
+            with self._lock:
+                self.last_success = success
+                if not success:
+                    self.dirty = True
+            return success
+
+
+def request(build_dir: Path, command: str, options: Optional[Dict[str, Any]] = None) -> Optional[bool]:
+    """Отправляет команду запущенному демону; None - если демон недоступен"""
+    address_file = Path(build_dir) / ADDRESS_FILE
+    try:
+        with open(address_file, 'r', encoding='utf-8') as f:
+            address = json.load(f)
+        if address['family'] == 'unix':
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(address['path'])
+        else:
+            connection = socket.create_connection(("127.0.0.1", address['port']))
+    except (OSError, ValueError, KeyError):
+        return None
+
+    message = dict(options or {}, command=command, token=address.get('token'))
+    success: Optional[bool] = False
+    with connection:
+        connection.sendall((json.dumps(message) + "\n").encode('utf-8'))
+        for line in connection.makefile('r', encoding='utf-8'):
+            reply = json.loads(line)
+            if 'output' in reply:
+                print(reply['output'])
+            if 'success' in reply:
+                success = reply['success']
+            if reply.get('unavailable'):
+                success = None
+    return success
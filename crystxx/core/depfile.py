@@ -0,0 +1,121 @@
+from pathlib import Path
+from typing import Dict, List, Tuple
+import json
+import os
+import threading
+
+# Префикс строк, которые cl печатает при /showIncludes
+SHOW_INCLUDES_PREFIX = "Note: including file:"
+
+
+def parse_depfile(text: str) -> List[str]:
+    """Разбирает make-совместимый depfile (gcc/clang -MD) и возвращает зависимости"""
+    # Склеиваем строки, перенесённые обратным слэшем
+    text = text.replace('\\\r\n', ' ').replace('\\\n', ' ')
+
+    deps: List[str] = []
+    for line in text.splitlines():
+        # Отделяем цели от зависимостей (двоеточие в "C:\\" не является разделителем)
+        separator = _find_rule_separator(line)
+        if separator == -1:
+            continue
+
+        for dep in _split_escaped(line[separator + 1:]):
+            if dep not in deps:
+                deps.append(dep)
+    return deps
+
+
+def _find_rule_separator(line: str) -> int:
+    """Находит двоеточие, отделяющее цель от зависимостей"""
+    i = 0
+    while i < len(line):
+        if line[i] == ':' and not (i == 1 and line[0].isalpha() and line[2:3] in ('\\', '/')):
+            # Двоеточие после буквы диска (C:\...) является частью пути
+            if i + 1 >= len(line) or line[i + 1] in (' ', '\t'):
+                return i
+        i += 1
+    return -1
+
+
+def _split_escaped(text: str) -> List[str]:
+    """Разбивает список путей с учётом экранированных пробелов"""
+    items = []
+    current = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '\\' and i + 1 < len(text) and text[i + 1] in (' ', '#'):
+            current.append(text[i + 1])
+            i += 2
+            continue
+        if char == '$' and i + 1 < len(text) and text[i + 1] == '$':
+            current.append('$')
+            i += 2
+            continue
+        if char in (' ', '\t'):
+            if current:
+                items.append(''.join(current))
+                current = []
+        else:
+            current.append(char)
+        i += 1
+
+    if current:
+        items.append(''.join(current))
+    return items
+
+
+def parse_show_includes(output: str) -> Tuple[List[str], str]:
+    """Извлекает зависимости из вывода cl /showIncludes, возвращает (зависимости, остальной вывод)"""
+    deps: List[str] = []
+    remaining = []
+    for line in output.splitlines():
+        if line.startswith(SHOW_INCLUDES_PREFIX):
+            dep = line[len(SHOW_INCLUDES_PREFIX):].strip()
+            if dep not in deps:
+                deps.append(dep)
+        else:
+            remaining.append(line)
+    return deps, '\n'.join(remaining)
+
+
+class DependencyDatabase:
+    """Постоянная база зависимостей объектных файлов от заголовков"""
+
+    def __init__(self, db_file: Path):
+        self.db_file = Path(db_file)
+        self.deps: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Загружает базу с диска"""
+        try:
+            with open(self.db_file, 'r', encoding='utf-8') as f:
+                self.deps = json.load(f).get('deps', {})
+        except (OSError, ValueError):
+            self.deps = {}
+
+    def save(self):
+        """Атомарно сохраняет базу на диск"""
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.db_file.with_name(self.db_file.name + '.tmp')
+        with self._lock:
+            deps = dict(self.deps)
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'deps': deps}, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.db_file)
+
+    def get(self, output: Path) -> List[str]:
+        """Возвращает известные зависимости объектного файла"""
+        return self.deps.get(str(output), [])
+
+    def update(self, output: Path, deps: List[str]):
+        """Запоминает зависимости объектного файла после компиляции"""
+        with self._lock:
+            self.deps[str(output)] = deps
+
+    def forget(self, output: Path):
+        """Удаляет зависимости объектного файла"""
+        with self._lock:
+            self.deps.pop(str(output), None)
@@ -0,0 +1,204 @@
+from typing import Dict, List, Any, Optional, TextIO
+import json
+import re
+import sys
+import threading
+
+# Флаг машиночитаемых диагностик gcc (clang его не поддерживает)
+JSON_DIAGNOSTICS_FLAG = "-fdiagnostics-format=json"
+
+# file:line:col: error: message [-Wflag] (gcc, clang)
+GNU_DIAGNOSTIC = re.compile(
+    r'^(?P<file>(?:[A-Za-z]:)?[^:\n]+):(?P<line>\d+):(?:(?P<column>\d+):)?\s*'
+    r'(?P<severity>fatal error|error|warning|note|remark):\s*(?P<message>.*?)'
+    r'(?:\s+\[(?P<option>-W[^\]]+)\])?$')
+
+# file(line,col): error C2065: message (cl)
+MSVC_DIAGNOSTIC = re.compile(
+    r'^(?P<file>.+?)\((?P<line>\d+)(?:,(?P<column>\d+))?\)\s*:\s*'
+    r'(?P<severity>fatal error|error|warning|note)\s*(?P<option>[A-Z]+\d+)?\s*:\s*(?P<message>.*)$')
+
+# Продолжение контекста включений: "                 from a.cpp:1:" (gcc)
+INCLUDE_CONTEXT = re.compile(r'^\s+from\s+.+:\d+[:,]\s*$')
+
+# collect2: error: ld returned 1 exit status / ld: warning: ...
+TOOL_DIAGNOSTIC = re.compile(r'^(?P<file>[\w.+-]+):\s*(?P<severity>fatal error|error|warning):\s*(?P<message>.*)$')
+
+
+def _record(file: Optional[str], line, column, severity: str, message: str,
+            option: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        'file': file,
+        'line': int(line) if line else None,
+        'column': int(column) if column else None,
+        # fatal error - тоже ошибка
+        'severity': "error" if severity == "fatal error" else severity,
+        'message': message.strip(),
+        'option': option
+    }
+
+
+def parse_diagnostic_line(line: str) -> Optional[Dict[str, Any]]:
+    """Разбирает строку текстового вывода gcc/clang/cl/линкера"""
+    line = line.rstrip()
+    for pattern in (GNU_DIAGNOSTIC, MSVC_DIAGNOSTIC, TOOL_DIAGNOSTIC):
+        match = pattern.match(line)
+        if match:
+            groups = match.groupdict()
+            return _record(groups['file'], groups.get('line'), groups.get('column'),
+                           groups['severity'], groups['message'], groups.get('option'))
+    return None
+
+
+def parse_json_diagnostics(text: str) -> Optional[List[Dict[str, Any]]]:
+    """Разбирает вывод gcc -fdiagnostics-format=json; None - если это не JSON"""
+    try:
+        items = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(items, list):
+        return None
+
+    records = []
+
+    def visit(item: Dict[str, Any]):
+        caret = (item.get('locations') or [{}])[0].get('caret', {})
+        records.append(_record(caret.get('file'), caret.get('line'), caret.get('column'),
+                               item.get('kind', 'error'), item.get('message', ''), item.get('option')))
+        for child in item.get('children', []):
+            visit(child)
+
+    for item in items:
+        if isinstance(item, dict):
+            visit(item)
+    return records
+
+
+def format_diagnostic(record: Dict[str, Any]) -> str:
+    """Переводит запись обратно в привычный вид file:line:col: severity: message"""
+    location = record['file'] or ""
+    if record['line']:
+        location += f":{record['line']}"
+        if record['column']:
+            location += f":{record['column']}"
+    text = f"{location}: {record['severity']}: {record['message']}"
+    if record['option']:
+        text += f" [{record['option']}]"
+    return text
+
+
+class DiagnosticStream:
+    """Разбирает вывод одной задачи по мере его поступления и убирает из него повторы"""
+
+    def __init__(self, reporter: 'DiagnosticsReporter', unit: str):
+        self.reporter = reporter
+        self.unit = unit
+        self._json_lines: List[str] = []
+        self._lines: List[str] = []
+        # Контекст перед диагностикой ("In file included from...") ждёт её заголовка
+        self._pending: List[str] = []
+        self._suppress = False
+
+    def feed(self, line: str):
+        """Принимает очередную строку вывода компилятора"""
+        if self._json_lines or (not self._lines and not self._pending and line.lstrip().startswith('[')):
+            # gcc печатает JSON-массив целиком в конце компиляции
+            self._json_lines.append(line)
+            return
+
+        record = parse_diagnostic_line(line)
+        if record:
+            is_new = self.reporter.emit(record, self.unit)
+            # Повтор из общего заголовка скрываем вместе с его контекстом и фрагментом кода
+            self._suppress = not is_new
+            if is_new:
+                self._lines.extend(self._pending)
+                self._lines.append(line)
+            self._pending = []
+        elif self._pending and INCLUDE_CONTEXT.match(line):
+            # Цепочка "In file included from" относится к следующей диагностике, а не к фрагменту кода
+            self._pending.append(line)
+        elif line[:1].isspace():
+            if not self._suppress:
+                self._lines.append(line)
+        else:
+            self._pending.append(line)
+
+    def close(self) -> str:
+        """Завершает разбор и возвращает вывод задачи без повторов"""
+        if self._json_lines:
+            text = "".join(self._json_lines)
+            records = parse_json_diagnostics(text)
+            if records is None:
+                # Не JSON - разбираем как обычный текст
+                self._json_lines = []
+                for line in text.splitlines(keepends=True):
+                    self.feed(line)
+            else:
+                new_records = [record for record in records if self.reporter.emit(record, self.unit)]
+                return "\n".join(format_diagnostic(record) for record in new_records)
+
+        self._lines.extend(self._pending)
+        self._pending = []
+        # Отступ первой строки (фрагмент кода, продолжение контекста) значим
+        return "".join(self._lines).rstrip().lstrip("\r\n")
+
+
+class DiagnosticsReporter:
+    """Собирает диагностики всех задач, убирает повторы и выводит их (--output json)"""
+
+    def __init__(self, output_format: str = "text", stream: Optional[TextIO] = None):
+        self.output_format = output_format
+        # Поток фиксируется при создании: человекочитаемый вывод в режиме json уходит в stderr
+        self.stream = stream or sys.stdout
+        self.counts = {'error': 0, 'warning': 0, 'note': 0, 'remark': 0}
+        self.duplicates = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    @property
+    def json(self) -> bool:
+        return self.output_format == "json"
+
+    def reset(self):
+        with self._lock:
+            self.counts = dict.fromkeys(self.counts, 0)
+            self.duplicates = 0
+            self._seen = set()
+
+    def unit(self, name: str) -> DiagnosticStream:
+        """Создаёт поток разбора для задачи (единицы трансляции или линковки)"""
+        return DiagnosticStream(self, name)
+
+    def report(self, name: str, output: str) -> str:
+        """Разбирает готовый вывод задачи (кэш, воркер, линковка) и возвращает его без повторов"""
+        stream = self.unit(name)
+        for line in output.splitlines(keepends=True):
+            stream.feed(line)
+        return stream.close()
+
+    def emit(self, record: Dict[str, Any], unit: str) -> bool:
+        """Учитывает диагностику; False - повтор из того же заголовка в другой единице"""
+        key = (record['file'], record['line'], record['column'], record['severity'], record['message'])
+        with self._lock:
+            if key in self._seen:
+                self.duplicates += 1
+                return False
+            self._seen.add(key)
+            self.counts[record['severity']] = self.counts.get(record['severity'], 0) + 1
+            if self.json:
+                self.stream.write(json.dumps(dict(record, type="diagnostic", unit=unit)) + "\n")
+                self.stream.flush()
+            return True
+
+    def finish(self, success: bool):
+        """Печатает итог: строку в текстовом режиме или запись summary в json"""
+        with self._lock:
+            errors, warnings = self.counts['error'], self.counts['warning']
+            if self.json:
+                self.stream.write(json.dumps({'type': "summary", 'success': success, 'errors': errors,
+                                              'warnings': warnings, 'duplicates': self.duplicates}) + "\n")
+                self.stream.flush()
+            elif errors or warnings:
+                duplicates = f" ({self.duplicates} duplicate(s) suppressed)" if self.duplicates else ""
+                print(f"Diagnostics: {errors} error(s), {warnings} warning(s){duplicates}")
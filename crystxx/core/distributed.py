@@ -0,0 +1,277 @@
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+import ipaddress
+import json
+import os
+import re
+import socket
+import socketserver
+import struct
+import subprocess
+import tempfile
+import threading
+
+from .toolchain import ToolchainCache
+
+DEFAULT_PORT = 3633
+PROTOCOL_VERSION = 1
+REMOTE_TIMEOUT = 300
+
+# Заголовок кадра: длина JSON-заголовка и длина бинарных данных
+FRAME_HEADER = struct.Struct('>II')
+
+# Компиляторы, которые воркер согласен запускать
+ALLOWED_COMPILERS = re.compile(r'^([\w.-]+-)?(gcc|g\+\+|cc|c\+\+|clang|clang\+\+)(-[\d.]+)?$')
+
+# Флаги кодогенерации, которые воркер принимает: стандарт, оптимизация, отладка, -f/-m/-W.
+# -D/-U безвредны - исходник уже препроцессирован. -Wa,/-Wp,/-Wl, с запятой сюда не подходят
+ALLOWED_FLAGS = re.compile(r'^(-std=[\w+]+|-O([0-3sgz]|fast)?|-g[\w=-]*|-f[^\s]+|-m[^\s]+|-W[\w=+-]*'
+                           r'|-[DU]\w+(=.*)?|-pthread|-w|-pedantic(-errors)?|-ansi)$')
+
+# Флаги -f/-m, которые загружают код, читают или пишут файлы на воркере
+FORBIDDEN_FLAG_PREFIXES = ('-fplugin', '-fprofile', '-fauto-profile', '-fcs-profile', '-fcreate-profile',
+                           '-fdump', '-fopt-info', '-ftime-trace', '-fsave-optimization-record',
+                           '-fcallgraph-info', '-fcompare-debug', '-fdiagnostics-add-output',
+                           '-fdiagnostics-set-output', '-fsanitize-blacklist', '-fsanitize-ignorelist',
+                           '-fsanitize-coverage-allowlist', '-fsanitize-coverage-ignorelist', '-fmodule',
+                           '-fprebuilt-module', '-fembed', '-fcrash-diagnostics', '-fproc-stat-report',
+                           '-fstack-usage', '-fcoverage', '-fpass-plugin', '-fdeps', '-mllvm')
+
+
+def flag_allowed(flag: str) -> bool:
+    """Проверяет флаг запроса по списку разрешённых"""
+    return bool(ALLOWED_FLAGS.match(flag)) and not flag.startswith(FORBIDDEN_FLAG_PREFIXES)
+
+
+def is_loopback(host: str) -> bool:
+    """Адрес доступен только с этой машины"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        # Пустой адрес (все интерфейсы) или имя хоста
+        return False
+
+
+def send_message(connection: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    """Отправляет кадр: JSON-заголовок и бинарные данные"""
+    header_bytes = json.dumps(header).encode('utf-8')
+    connection.sendall(FRAME_HEADER.pack(len(header_bytes), len(payload)) + header_bytes + payload)
+
+
+def receive_message(connection: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    """Принимает кадр, отправленный send_message"""
+    header_size, payload_size = FRAME_HEADER.unpack(_receive_exactly(connection, FRAME_HEADER.size))
+    header = json.loads(_receive_exactly(connection, header_size).decode('utf-8'))
+    return header, _receive_exactly(connection, payload_size)
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size > 0:
+        chunk = connection.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def parse_worker(spec: str) -> Dict[str, Any]:
+    """Разбирает адрес воркера host[:port][/slots]"""
+    address, _, slots = spec.partition('/')
+    host, _, port = address.rpartition(':') if ':' in address else (address, '', '')
+    return {
+        'host': host or address,
+        'port': int(port) if port else DEFAULT_PORT,
+        'slots': int(slots) if slots else 1
+    }
+
+
+class RemoteWorker:
+    """Удалённый воркер и число занятых на нём слотов"""
+
+    def __init__(self, host: str, port: int, slots: int):
+        self.host = host
+        self.port = port
+        self.slots = slots
+        self.busy = 0
+        self.available = True
+
+    @property
+    def name(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+class WorkerPool:
+    """Распределяет единицы трансляции между локальными и удалёнными слотами"""
+
+    def __init__(self, worker_specs: List[str], local_slots: int):
+        self.workers = [RemoteWorker(**parse_worker(spec)) for spec in worker_specs]
+        self.local_slots = max(1, local_slots)
+        self.local_busy = 0
+        self.remote_jobs = 0
+        self.local_jobs = 0
+        self._condition = threading.Condition()
+
+    @property
+    def remote_slots(self) -> int:
+        return sum(worker.slots for worker in self.workers)
+
+    def acquire(self) -> Optional[RemoteWorker]:
+        """Занимает свободный слот: удалённый воркер или None для локальной компиляции"""
+        with self._condition:
+            while True:
+                # Сначала отдаём работу воркерам, чтобы локальные ядра оставались
+                # свободными для препроцессора и линковки
+                free = [w for w in self.workers if w.available and w.busy < w.slots]
+                if free:
+                    worker = min(free, key=lambda w: w.busy / w.slots)
+                    worker.busy += 1
+                    return worker
+                if self.local_busy < self.local_slots:
+                    self.local_busy += 1
+                    return None
+                self._condition.wait()
+
+    def release(self, worker: Optional[RemoteWorker]):
+        """Освобождает слот"""
+        with self._condition:
+            if worker:
+                worker.busy -= 1
+            else:
+                self.local_busy -= 1
+            self._condition.notify_all()
+
+    def mark_down(self, worker: RemoteWorker, reason: str):
+        """Исключает недоступный воркер до конца сборки"""
+        with self._condition:
+            if worker.available:
+                print(f"Warning: worker {worker.name} unavailable ({reason}), compiling locally")
+            worker.available = False
+            self._condition.notify_all()
+
+    def count(self, remote: bool):
+        with self._condition:
+            if remote:
+                self.remote_jobs += 1
+            else:
+                self.local_jobs += 1
+
+    def summary(self) -> str:
+        return f"Distributed: {self.remote_jobs} remote, {self.local_jobs} local compile(s)"
+
+
+def compile_remote(worker: RemoteWorker, compiler: str, identity: Dict[str, str], language: str,
+                   flags: List[str], preprocessed: bytes, object_file: Path) -> Tuple[bool, str]:
+    """Компилирует препроцессированный исходник на воркере; (успех, вывод компилятора)"""
+    header = {
+        'version': PROTOCOL_VERSION,
+        'token': os.environ.get("CRYSTXX_WORKER_TOKEN", ""),
+        'compiler': compiler,
+        'identity': identity,
+        'language': language,
+        'flags': flags
+    }
+    with socket.create_connection((worker.host, worker.port), timeout=REMOTE_TIMEOUT) as connection:
+        send_message(connection, header, preprocessed)
+        reply, payload = receive_message(connection)
+
+    if reply.get('status') != 'ok':
+        # Воркер не может скомпилировать (другой компилятор и т.п.)
+        raise ConnectionError(reply.get('error', 'worker error'))
+
+    if reply.get('returncode') == 0:
+        object_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = object_file.with_name(object_file.name + '.tmp')
+        tmp_file.write_bytes(payload)
+        os.replace(tmp_file, object_file)
+        return True, reply.get('output', '')
+    return False, reply.get('output', '')
+
+
+class _WorkerHandler(socketserver.BaseRequestHandler):
+    """Обрабатывает один запрос на компиляцию"""
+
+    def handle(self):
+        server: 'CompileWorkerServer' = self.server
+        try:
+            header, payload = receive_message(self.request)
+        except (ConnectionError, ValueError, struct.error):
+            return
+
+        try:
+            reply, object_data = server.compile(header, payload)
+        except Exception as e:
+            reply, object_data = {'status': 'error', 'error': str(e)}, b""
+        try:
+            send_message(self.request, reply, object_data)
+        except OSError:
+            pass
+
+
+class CompileWorkerServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Сервер компиляции (crystxx --worker)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str, port: int, jobs: int):
+        super().__init__((host, port), _WorkerHandler)
+        self.jobs = jobs
+        self.token = os.environ.get("CRYSTXX_WORKER_TOKEN", "")
+        self.toolchains = ToolchainCache()
+        self._slots = threading.BoundedSemaphore(jobs)
+
+    def compile(self, header: Dict[str, Any], payload: bytes) -> Tuple[Dict[str, Any], bytes]:
+        """Проверяет запрос и компилирует единицу трансляции"""
+        if header.get('version') != PROTOCOL_VERSION:
+            return {'status': 'error', 'error': 'protocol version mismatch'}, b""
+        if header.get('token', '') != self.token:
+            return {'status': 'error', 'error': 'invalid token'}, b""
+
+        compiler = header.get('compiler', '')
+        if not ALLOWED_COMPILERS.match(compiler):
+            return {'status': 'error', 'error': f'compiler not allowed: {compiler}'}, b""
+        flags = header.get('flags', [])
+        forbidden = [flag for flag in flags if not isinstance(flag, str) or not flag_allowed(flag)]
+        if forbidden:
+            return {'status': 'error', 'error': f'flag not allowed: {forbidden[0]}'}, b""
+
+        # Объект должен быть собран тем же компилятором, что и у клиента
+        toolchain = self.toolchains.resolve(compiler)
+        identity = header.get('identity', {})
+        if (not toolchain or toolchain.version != identity.get('version')
+                or toolchain.target != identity.get('target')):
+            return {'status': 'error', 'error': f'compiler mismatch for {compiler}'}, b""
+
+        language = "c++-cpp-output" if header.get('language') == "CPP" else "cpp-output"
+        suffix = ".ii" if header.get('language') == "CPP" else ".i"
+        with self._slots, tempfile.TemporaryDirectory(prefix="crystxx-worker-") as tmp_dir:
+            source_file = Path(tmp_dir) / f"unit{suffix}"
+            object_file = Path(tmp_dir) / "unit.o"
+            source_file.write_bytes(payload)
+            cmd = [toolchain.path, "-x", language, "-c", *flags, str(source_file), "-o", str(object_file)]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            output = (result.stdout + result.stderr).strip()
+            object_data = object_file.read_bytes() if result.returncode == 0 else b""
+
+        return {'status': 'ok', 'returncode': result.returncode, 'output': output}, object_data
+
+
+def serve_worker(host: str = "127.0.0.1", port: int = DEFAULT_PORT, jobs: Optional[int] = None) -> bool:
+    """Запускает сервер компиляции и блокируется до Ctrl+C"""
+    if not is_loopback(host) and not os.environ.get("CRYSTXX_WORKER_TOKEN"):
+        # Без токена любой, кто достучится до порта, запускает компилятор на этой машине
+        print(f"Refusing to listen on {host or 'all interfaces'} without CRYSTXX_WORKER_TOKEN; "
+              f"set a shared token on the worker and the clients")
+        return False
+    jobs = jobs or os.cpu_count() or 1
+    with CompileWorkerServer(host, port, jobs) as server:
+        print(f"Crystxx worker listening on {host}:{server.server_address[1]} with {jobs} slot(s)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Worker stopped")
+    return True
@@ -0,0 +1,146 @@
+from typing import Dict, List, Any, Iterable, Optional, Set
+
+
+class TargetGraph:
+    """Граф зависимостей целей (исполнителей, тестов и библиотек) из INCLUDE_EXECUTOR"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.edges: Dict[str, List[str]] = {}
+
+        for executor in config['executors'] + config.get('tests', []):
+            self.edges[executor['name']] = list(executor.get('dependencies', []))
+        for lib_name, library in config['libraries'].items():
+            self.edges.setdefault(lib_name, list(library.get('dependencies', [])))
+
+    def targets(self) -> List[str]:
+        """Возвращает имена всех целей"""
+        return list(self.edges)
+
+    def is_library(self, name: str) -> bool:
+        """Проверяет, является ли цель библиотекой"""
+        return name in self.config['libraries']
+
+    def is_test(self, name: str) -> bool:
+        """Проверяет, является ли цель тестом (CREATE_TEST)"""
+        return any(test['name'] == name for test in self.config.get('tests', []))
+
+    def dependencies(self, name: str) -> List[str]:
+        """Возвращает прямые зависимости цели, известные в конфиге"""
+        return [dep for dep in self.edges.get(name, []) if dep in self.edges]
+
+    def transitive_dependencies(self, name: str) -> List[str]:
+        """Возвращает все зависимости цели в порядке линковки (зависимые раньше зависимостей)"""
+        order: List[str] = []
+        visited: Set[str] = set()
+
+        def visit(node: str):
+            if node in visited:
+                return
+            visited.add(node)
+            for dep in self.dependencies(node):
+                visit(dep)
+            order.append(node)
+
+        for dep in self.dependencies(name):
+            visit(dep)
+        # Обход в глубину даёт зависимости раньше зависимых - разворачиваем для линкера
+        return list(reversed(order))
+
+    def topological_order(self) -> List[str]:
+        """Возвращает все цели так, что зависимости идут раньше зависимых"""
+        order: List[str] = []
+        visited: Set[str] = set()
+
+        def visit(node: str):
+            if node in visited:
+                return
+            visited.add(node)
+            for dep in self.dependencies(node):
+                visit(dep)
+            order.append(node)
+
+        for node in self.edges:
+            visit(node)
+        return order
+
+    def reverse_dependencies(self, name: str) -> List[str]:
+        """Возвращает цели, напрямую зависящие от name"""
+        return [node for node in self.edges if name in self.dependencies(node)]
+
+    def transitive_dependents(self, name: str) -> List[str]:
+        """Возвращает все цели, которые придётся пересобрать при изменении name"""
+        result: List[str] = []
+        stack = self.reverse_dependencies(name)
+        while stack:
+            node = stack.pop()
+            if node in result or node == name:
+                continue
+            result.append(node)
+            stack.extend(self.reverse_dependencies(node))
+        return [node for node in self.topological_order() if node in result]
+
+    def closure(self, names: Iterable[str]) -> Set[str]:
+        """Возвращает цели вместе со всеми их транзитивными зависимостями"""
+        selected: Set[str] = set()
+        for name in names:
+            selected.add(name)
+            selected.update(self.transitive_dependencies(name))
+        return selected
+
+    def find_cycles(self) -> List[List[str]]:
+        """Находит циклы в INCLUDE_EXECUTOR; каждый цикл - путь, замкнутый на первую цель"""
+        cycles: List[List[str]] = []
+        state: Dict[str, int] = {}
+        path: List[str] = []
+
+        def visit(node: str):
+            # 1 - цель в текущем пути обхода, 2 - полностью обработана
+            state[node] = 1
+            path.append(node)
+            for dep in self.dependencies(node):
+                if state.get(dep) == 1:
+                    cycles.append(path[path.index(dep):] + [dep])
+                elif dep not in state:
+                    visit(dep)
+            path.pop()
+            state[node] = 2
+
+        for node in self.edges:
+            if node not in state:
+                visit(node)
+        return cycles
+
+    def to_text(self, names: Optional[Iterable[str]] = None) -> str:
+        """Текстовое описание графа в топологическом порядке"""
+        selected = self.closure(names) if names else set(self.edges)
+        lines = []
+        for node in self.topological_order():
+            if node not in selected:
+                continue
+            kind = "library" if self.is_library(node) else "test" if self.is_test(node) else "executor"
+            lines.append(f"{node} ({kind})")
+            lines.append(f"  depends on: {', '.join(self.dependencies(node)) or '-'}")
+            lines.append(f"  used by: {', '.join(self.reverse_dependencies(node)) or '-'}")
+        for cycle in self.find_cycles():
+            lines.append(f"Cycle: {' -> '.join(cycle)}")
+        return "\n".join(lines)
+
+    def to_dot(self, names: Optional[Iterable[str]] = None) -> str:
+        """Описание графа в формате Graphviz DOT"""
+        selected = self.closure(names) if names else set(self.edges)
+        cycle_edges = {(cycle[i], cycle[i + 1]) for cycle in self.find_cycles() for i in range(len(cycle) - 1)}
+        lines = ["digraph crystxx {", "  rankdir=LR;"]
+        for node in self.topological_order():
+            if node not in selected:
+                continue
+            shape = "box" if self.is_library(node) else "ellipse"
+            lines.append(f'  "{node}" [shape={shape}];')
+        for node in self.topological_order():
+            if node not in selected:
+                continue
+            for dep in self.dependencies(node):
+                style = " [color=red]" if (node, dep) in cycle_edges else ""
+                lines.append(f'  "{node}" -> "{dep}"{style};')
+        lines.append("}")
+        return "\n".join(lines)
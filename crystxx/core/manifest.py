@@ -0,0 +1,114 @@
+from pathlib import Path
+from typing import Iterable, List, Set, Tuple
+import json
+import os
+import shutil
+
+MANIFEST_FILE = ".crystxx_manifest.json"
+
+
+def normalize_path(path) -> str:
+    """Приводит путь к единому виду (относительно текущей папки, как в состоянии сборки)"""
+    return os.path.normpath(os.path.relpath(os.path.abspath(str(path))))
+
+
+def tree_size(path: Path) -> int:
+    """Суммарный размер файлов в папке"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class BuildManifest:
+    """Список артефактов, созданных последней сборкой, - для удаления осиротевших файлов"""
+
+    def __init__(self, build_dir: Path):
+        self.build_dir = Path(build_dir)
+        self.manifest_file = self.build_dir / MANIFEST_FILE
+        self.outputs: Set[str] = set()
+
+    def load(self):
+        """Загружает манифест с диска"""
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                self.outputs = set(json.load(f).get('outputs', []))
+        except (OSError, ValueError):
+            self.outputs = set()
+
+    def save(self, outputs: Iterable[str]):
+        """Атомарно сохраняет манифест"""
+        self.outputs = {normalize_path(output) for output in outputs}
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_name(self.manifest_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'outputs': sorted(self.outputs)}, f, indent=1)
+        os.replace(tmp_file, self.manifest_file)
+
+    def _inside_build_dir(self, path: str) -> bool:
+        return os.path.abspath(path).startswith(os.path.abspath(self.build_dir) + os.sep)
+
+    def prune(self, previous: Iterable[str], current: Iterable[str]) -> List[str]:
+        """Удаляет артефакты прошлых сборок, которые текущая сборка больше не создаёт"""
+        current_set = {normalize_path(output) for output in current}
+        removed = []
+        for output in sorted({normalize_path(output) for output in previous} - current_set):
+            # Удаляем только файлы внутри своего дерева сборки
+            if not self._inside_build_dir(output) or not os.path.isfile(output):
+                continue
+            try:
+                os.remove(output)
+            except OSError:
+                continue
+            removed.append(output)
+            self._remove_empty_dirs(Path(output).parent)
+        return removed
+
+    def sweep(self, directories: Iterable[str]) -> Tuple[int, int]:
+        """Удаляет из папок сборки файлы, которых нет в манифесте; возвращает (число, байты)"""
+        count, freed = 0, 0
+        for name in directories:
+            for root, _, files in os.walk(self.build_dir / name):
+                for file_name in files:
+                    path = os.path.join(root, file_name)
+                    if normalize_path(path) in self.outputs:
+                        continue
+                    try:
+                        size = os.lstat(path).st_size
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    count += 1
+                    freed += size
+                    self._remove_empty_dirs(Path(root))
+        return count, freed
+
+    def _remove_empty_dirs(self, directory: Path):
+        build_dir = os.path.abspath(self.build_dir)
+        while os.path.abspath(directory).startswith(build_dir + os.sep):
+            try:
+                directory.rmdir()
+            except OSError:
+                return
+            directory = directory.parent
+
+
+def profile_trees(root_build_dir: Path) -> List[Tuple[float, Path]]:
+    """Деревья сборки профилей (build/<профиль>/) и время их последней сборки"""
+    trees = []
+    if not root_build_dir.is_dir():
+        return trees
+    for entry in os.scandir(root_build_dir):
+        manifest = Path(entry.path) / MANIFEST_FILE
+        if entry.is_dir() and manifest.exists():
+            trees.append((manifest.stat().st_mtime, Path(entry.path)))
+    return trees
+
+
+def remove_tree(path: Path):
+    """Удаляет папку сборки целиком"""
+    shutil.rmtree(path, ignore_errors=True)
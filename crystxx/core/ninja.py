@@ -0,0 +1,119 @@
+from typing import Dict, Iterable, List, Optional
+import os
+import shlex
+import subprocess
+
+from .command_line import max_command_length, response_file_content
+
+NINJA_FILE = "build.ninja"
+
+# ninja передаёт команду ребра одним аргументом /bin/sh -c, а Linux ограничивает
+# длину одного аргумента 128 КБ (MAX_ARG_STRLEN) - независимо от общего лимита командной строки
+SHELL_ARGUMENT_LIMIT = 128 * 1024 - 1024
+
+# Правила, общие для всех целей: команда передаётся в переменной $cmd каждого ребра.
+# Варианты *_rsp передают аргументы через @response файл, если строка слишком длинная
+RULES = {
+    'compile': {'description': "Compiling $in", 'depfile': "$out.d", 'deps': "gcc"},
+    'compile_msvc': {'description': "Compiling $in", 'deps': "msvc"},
+    'archive': {'description': "Archiving $out"},
+    'link': {'description': "Linking $out"},
+}
+
+
+def escape_path(path) -> str:
+    """Экранирует путь для строки build: $, пробел и двоеточие"""
+    return str(path).replace('$', '$$').replace(' ', '$ ').replace(':', '$:')
+
+
+def escape_value(value: str) -> str:
+    """Экранирует значение переменной ninja"""
+    return value.replace('$', '$$')
+
+
+def shell_command(cmd: List[str]) -> str:
+    """Команда одной строкой: ninja запускает её через /bin/sh (в Windows - через CreateProcess)"""
+    if os.name == 'nt':
+        return subprocess.list2cmdline(cmd)
+    return shlex.join(cmd)
+
+
+def max_ninja_command_length() -> int:
+    """Допустимая длина $cmd ребра: лимит командной строки, но не больше одного аргумента sh"""
+    return min(max_command_length(), SHELL_ARGUMENT_LIMIT)
+
+
+class NinjaWriter:
+    """Формирует текст build.ninja"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def comment(self, text: str):
+        self.lines.append(f"# {text}")
+
+    def newline(self):
+        self.lines.append("")
+
+    def variable(self, name: str, value: str, indent: int = 0):
+        self.lines.append(f"{'  ' * indent}{name} = {value}")
+
+    def rule(self, name: str, command: str, **options: str):
+        self.lines.append(f"rule {name}")
+        self.variable("command", command, indent=1)
+        for key, value in options.items():
+            self.variable(key, value, indent=1)
+        self.newline()
+
+    def build(self, outputs: Iterable, rule: str, inputs: Iterable = (), implicit: Iterable = (),
+              implicit_outputs: Iterable = (), variables: Optional[Dict[str, str]] = None):
+        line = "build " + " ".join(escape_path(output) for output in outputs)
+        implicit_outputs = list(implicit_outputs)
+        if implicit_outputs:
+            line += " | " + " ".join(escape_path(output) for output in implicit_outputs)
+        line += f": {rule}"
+        for path in inputs:
+            line += f" {escape_path(path)}"
+        implicit = list(implicit)
+        if implicit:
+            line += " | " + " ".join(escape_path(path) for path in implicit)
+        self.lines.append(line)
+        for key, value in (variables or {}).items():
+            self.variable(key, escape_value(value), indent=1)
+
+    def default(self, outputs: Iterable):
+        self.lines.append("default " + " ".join(escape_path(output) for output in outputs))
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def write_rules(writer: NinjaWriter, regenerate_command: str, msvc: bool):
+    """Записывает правила компиляции, архивации, линковки и перегенерации"""
+    for name, options in RULES.items():
+        if name == ("compile" if msvc else "compile_msvc"):
+            continue
+        writer.rule(name, "$cmd", **options)
+        writer.rule(f"{name}_rsp", "$tool @$out.rsp", rspfile="$out.rsp", rspfile_content="$args", **options)
+    if not msvc and os.name != 'nt':
+        # ar дописывает в существующий архив: старый удаляется, объекты всегда идут через @response файл
+        writer.rule("archive_replace", "rm -f $out && $tool @$out.rsp", rspfile="$out.rsp",
+                    rspfile_content="$args", **RULES['archive'])
+    writer.rule("regenerate", escape_value(regenerate_command), description="Regenerating $out", generator="1")
+
+
+def response_edge(writer: NinjaWriter, rule: str, outputs: Iterable, inputs: Iterable, cmd: List[str],
+                  implicit: Iterable = (), implicit_outputs: Iterable = ()):
+    """Ребро правила вида $tool @$out.rsp: аргументы команды записываются в @response файл"""
+    variables = {'tool': shell_command(cmd[:1]), 'args': response_file_content(cmd, " ")}
+    writer.build(outputs, rule, inputs, implicit, implicit_outputs, variables)
+
+
+def command_edge(writer: NinjaWriter, rule: str, outputs: Iterable, inputs: Iterable, cmd: List[str],
+                 implicit: Iterable = (), implicit_outputs: Iterable = ()):
+    """Ребро с командой инструмента; слишком длинная команда уходит в @response файл"""
+    line = shell_command(cmd)
+    if len(os.fsencode(line)) > max_ninja_command_length():
+        response_edge(writer, f"{rule}_rsp", outputs, inputs, cmd, implicit, implicit_outputs)
+        return
+    writer.build(outputs, rule, inputs, implicit, implicit_outputs, {'cmd': line})
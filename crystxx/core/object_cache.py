@@ -0,0 +1,172 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+import json
+import os
+import shutil
+import threading
+import uuid
+
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# Текущий размер кэша - чтобы не обходить все записи после каждой сборки
+SIZE_FILE = "size.json"
+
+# Вытеснение освобождает место с запасом, иначе каждая следующая сборка снова сканировала бы кэш
+CLEANUP_TARGET = 0.9
+
+
+def parse_size(value: str) -> int:
+    """Переводит размер вида 500M / 5G / 1024 в байты"""
+    value = str(value).strip().upper().rstrip('B')
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def format_size(size: int) -> str:
+    """Переводит байты в строку вида 1.5M"""
+    for unit in ('T', 'G', 'M', 'K'):
+        if size >= SIZE_UNITS[unit]:
+            return f"{size / SIZE_UNITS[unit]:.1f}{unit}"
+    return f"{size}B"
+
+
+def strip_line_markers(preprocessed: bytes) -> bytes:
+    """Удаляет маркеры строк (# 1 "file" / #line), содержащие пути конкретного checkout"""
+    lines = []
+    for line in preprocessed.splitlines():
+        stripped = line.lstrip()
+        if stripped.startswith(b'#line') or (stripped.startswith(b'# ') and stripped[2:3].isdigit()):
+            continue
+        lines.append(line)
+    return b'\n'.join(lines)
+
+
+class ObjectCache:
+    """Локальный кэш объектных файлов, адресуемый по хэшу содержимого (в стиле ccache)"""
+
+    def __init__(self, cache_dir: Path, max_size: int):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Байт, записанных put() в этой сборке
+        self.stored = 0
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key: str, object_file: Path) -> Optional[str]:
+        """Копирует объект из кэша, возвращает сохранённый вывод компилятора или None"""
+        entry = self._entry_dir(key)
+        try:
+            with open(entry / "meta.json", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self._copy(entry / "object", object_file)
+            # Обновляем время использования для LRU-вытеснения
+            os.utime(entry, None)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return meta.get('output', '')
+
+    def put(self, key: str, object_file: Path, output: str = ""):
+        """Сохраняет объектный файл в кэш"""
+        entry = self._entry_dir(key)
+        # Пишем во временную папку и переименовываем, чтобы параллельные сборки
+        # никогда не видели наполовину записанную запись
+        tmp_entry = entry.with_name(f"{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp_entry.mkdir(parents=True)
+            shutil.copyfile(object_file, tmp_entry / "object")
+            with open(tmp_entry / "meta.json", 'w', encoding='utf-8') as f:
+                json.dump({'output': output}, f)
+            size = sum(f.stat().st_size for f in os.scandir(tmp_entry))
+            os.replace(tmp_entry, entry)
+            with self._lock:
+                self.stored += size
+        except OSError:
+            # Запись уже создана другим процессом или кэш недоступен - не критично
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    def _copy(self, source: Path, destination: Path):
+        """Атомарно копирует файл из кэша"""
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = destination.with_name(destination.name + '.tmp')
+        shutil.copyfile(source, tmp_file)
+        os.replace(tmp_file, destination)
+
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """Возвращает записи кэша (время использования, размер, путь), старые - первыми"""
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        return sorted(entries)
+
+    def cleanup(self, max_size: Optional[int] = None, target: Optional[int] = None) -> int:
+        """Если кэш больше лимита, вытесняет давно не использованные записи до target (по умолчанию -
+        до лимита); возвращает освобождённый объём"""
+        max_size = self.max_size if max_size is None else max_size
+        target = max_size if target is None else target
+        entries = self.entries()
+        total_size = sum(size for _, size, _ in entries)
+        freed = 0
+        if total_size > max_size:
+            for _, size, path in entries:
+                if total_size <= target:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total_size -= size
+                freed += size
+        self._save_size(total_size)
+        return freed
+
+    def cleanup_if_needed(self) -> int:
+        """После сборки: обходит кэш, только если сборка что-то записала и сохранённый размер превысил лимит"""
+        with self._lock:
+            stored, self.stored = self.stored, 0
+        if not stored:
+            return 0
+        size = self._load_size()
+        if size is not None and size + stored <= self.max_size:
+            self._save_size(size + stored)
+            return 0
+        # Размер неизвестен (кэш старого формата) или лимит превышен - пересчитываем по записям
+        return self.cleanup(target=int(self.max_size * CLEANUP_TARGET))
+
+    def _load_size(self) -> Optional[int]:
+        try:
+            with open(self.cache_dir / SIZE_FILE, 'r', encoding='utf-8') as f:
+                return int(json.load(f)['size'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_size(self, size: int):
+        """Атомарно сохраняет размер кэша; параллельные сборки могут его занизить - вытеснение пересчитает"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_dir / f"{SIZE_FILE}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'size': size}, f)
+            os.replace(tmp_file, self.cache_dir / SIZE_FILE)
+        except OSError:
+            pass
+
+    def summary(self) -> str:
+        """Возвращает строку статистики попаданий"""
+        lookups = self.hits + self.misses
+        rate = 100.0 * self.hits / lookups if lookups else 0.0
+        return f"Cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
@@ -0,0 +1,121 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+import os
+import shutil
+import subprocess
+
+from .state import compute_signature, file_stamp
+from .toolchain import Toolchain
+
+LTO_MODES = ("full", "thin")
+PGO_MODES = ("generate", "use")
+
+# Файл с объединёнными профилями clang (llvm-profdata merge)
+CLANG_PROFDATA = "default.profdata"
+
+
+class OptimizationFlags:
+    """Дополнительные флаги компиляции и линковки для LTO и PGO"""
+
+    def __init__(self):
+        self.compile_flags: List[str] = []
+        self.link_flags: List[str] = []
+        # Архиватор, понимающий LTO-объекты (gcc-ar / llvm-ar)
+        self.archiver: Optional[str] = None
+        # Отпечаток данных профилирования - объекты пересобираются при их изменении
+        self.fingerprint = ""
+
+
+def is_clang(compiler: str) -> bool:
+    return "clang" in Path(compiler).name.lower()
+
+
+def is_msvc(compiler: str) -> bool:
+    return Path(compiler).stem.lower() in ["cl", "clang-cl"]
+
+
+def lto_flags(compiler: str, toolchain: Optional[Toolchain], mode: str,
+              jobs: Optional[int]) -> Tuple[List[str], List[str]]:
+    """Возвращает флаги LTO (компиляция, линковка) для компилятора"""
+    if is_msvc(compiler):
+        return ["/GL"], ["/link", "/LTCG"]
+
+    if mode == "thin" and not (toolchain and toolchain.supports("-flto=thin")):
+        print(f"Warning: {compiler} does not support ThinLTO, using full LTO")
+        mode = "full"
+
+    if is_clang(compiler):
+        flag = "-flto=thin" if mode == "thin" else "-flto"
+        link_flags = [flag]
+        if jobs:
+            link_flags.append(f"-flto-jobs={jobs}")
+        return [flag], link_flags
+
+    # gcc распараллеливает LTO на этапе линковки через -flto=N
+    return ["-flto"], [f"-flto={jobs}" if jobs else "-flto=auto"]
+
+
+def lto_archiver(compiler: str) -> Optional[str]:
+    """Находит архиватор с поддержкой LTO-плагина"""
+    name = Path(compiler).name
+    if is_clang(compiler):
+        candidates = [name.replace("clang++", "llvm-ar").replace("clang", "llvm-ar"), "llvm-ar"]
+    else:
+        # g++-12 -> gcc-ar-12, x86_64-linux-gnu-gcc -> x86_64-linux-gnu-gcc-ar
+        base = name.replace("g++", "gcc")
+        prefix, _, version = base.partition("gcc")
+        candidates = [f"{prefix}gcc-ar{version}", "gcc-ar"]
+
+    for candidate in candidates:
+        if shutil.which(candidate):
+            return candidate
+    return None
+
+
+def pgo_flags(compiler: str, mode: str, pgo_dir: Path) -> Tuple[List[str], List[str]]:
+    """Возвращает флаги PGO (компиляция, линковка); pgo_dir должен быть абсолютным"""
+    if mode == "generate":
+        flags = [f"-fprofile-generate={pgo_dir}"]
+        if not is_clang(compiler):
+            # Счётчики многопоточных программ иначе портятся
+            flags.append("-fprofile-update=atomic")
+        return flags, flags
+
+    if is_clang(compiler):
+        flags = [f"-fprofile-use={pgo_dir / CLANG_PROFDATA}", "-Wno-profile-instr-unprofiled"]
+    else:
+        flags = [f"-fprofile-use={pgo_dir}", "-fprofile-partial-training", "-Wno-missing-profile"]
+    return flags, flags
+
+
+def merge_clang_profiles(compiler: str, pgo_dir: Path) -> bool:
+    """Объединяет .profraw файлы clang в default.profdata"""
+    raw_profiles = sorted(pgo_dir.glob("*.profraw"))
+    if not raw_profiles:
+        return (pgo_dir / CLANG_PROFDATA).exists()
+
+    name = Path(compiler).name
+    profdata_tool = next((tool for tool in (name.replace("clang++", "llvm-profdata").replace("clang", "llvm-profdata"),
+                                            "llvm-profdata") if shutil.which(tool)), None)
+    if not profdata_tool:
+        print("llvm-profdata not found, cannot merge clang profiles")
+        return False
+
+    cmd = [profdata_tool, "merge", f"-output={pgo_dir / CLANG_PROFDATA}", *[str(p) for p in raw_profiles]]
+    print(f"Merging {len(raw_profiles)} profile(s) with {profdata_tool}")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr)
+        return False
+    return True
+
+
+def profile_fingerprint(pgo_dir: Path) -> str:
+    """Отпечаток собранных профилей (.gcda / .profdata)"""
+    profiles = []
+    for root, _, files in os.walk(pgo_dir):
+        for name in sorted(files):
+            if name.endswith((".gcda", ".profdata")):
+                path = Path(root) / name
+                profiles.append([str(path), file_stamp(path)])
+    return compute_signature(sorted(profiles))
@@ -0,0 +1,106 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional
+import json
+import os
+import threading
+import time
+
+from .scheduler import Job
+
+
+class BuildProfiler:
+    """Собирает длительности фаз и задач сборки в формате Chrome trace"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+        self.jobs: List[Job] = []
+        self._lock = threading.Lock()
+
+    def _timestamp(self, moment: float) -> float:
+        """Переводит perf_counter в микросекунды от начала сборки"""
+        return (moment - self.origin) * 1e6
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Замеряет фазу сборки (разбор конфига, разрешение зависимостей...)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_event(name, "phase", start, time.perf_counter() - start, tid=0)
+
+    def _add_event(self, name: str, category: str, start: float, duration: float,
+                   tid: int, args: Optional[Dict[str, Any]] = None):
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': self._timestamp(start),
+            'dur': duration * 1e6,
+            'pid': os.getpid(),
+            'tid': tid
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.events.append(event)
+
+    def record_jobs(self, jobs: List[Job]):
+        """Добавляет выполненные задачи, каждый поток пула - отдельная дорожка"""
+        workers: Dict[str, int] = {}
+        for job in jobs:
+            result = job.result
+            if result is None or result.start is None:
+                continue
+            tid = workers.setdefault(result.worker, len(workers) + 1)
+            category = "up-to-date" if result.skipped else job.kind
+            self._add_event(job.description, category, result.start, result.duration, tid,
+                            {'output': job.name, 'success': result.success})
+            self.jobs.append(job)
+
+    def merge_time_trace(self, trace_file: Path, job: Job):
+        """Встраивает вывод clang -ftime-trace внутрь события задачи компиляции"""
+        try:
+            with open(trace_file, 'r', encoding='utf-8') as f:
+                trace = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        tid = next((e['tid'] for e in self.events if e.get('args', {}).get('output') == job.name), 0)
+        # Времена clang отсчитываются от начала процесса компилятора
+        offset = self._timestamp(job.result.start)
+        for event in trace.get('traceEvents', []):
+            if event.get('ph') != 'X':
+                continue
+            merged = dict(event, pid=os.getpid(), tid=tid, ts=event.get('ts', 0) + offset)
+            merged['cat'] = "time-trace"
+            with self._lock:
+                self.events.append(merged)
+
+    def write(self, output_file: Path):
+        """Записывает профиль в формате Chrome trace event"""
+        output_file = Path(output_file)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+    def slowest_units(self, count: int = 10) -> List[Job]:
+        """Возвращает самые медленные реально выполненные задачи компиляции"""
+        compiled = [job for job in self.jobs
+                    if job.kind in ("compile", "pch") and not job.result.skipped]
+        return sorted(compiled, key=lambda job: job.result.duration, reverse=True)[:count]
+
+    def print_summary(self, count: int = 10):
+        """Печатает сводку по фазам и самым медленным единицам трансляции"""
+        print("Build profile:")
+        for event in self.events:
+            if event['cat'] == "phase":
+                print(f"  {event['name']}: {event['dur'] / 1e3:.1f} ms")
+
+        slowest = self.slowest_units(count)
+        if slowest:
+            print("Slowest translation units:")
+            for job in slowest:
+                print(f"  {job.result.duration:8.2f} s  {job.description}")
@@ -1,29 +1,27 @@
 from pathlib import Path
+import datetime
 import subprocess
 import sys
+from typing import Dict, Any, Optional
 
 from .config_parser import ConfigParser
+from .benchmark import (measure_run, summarize_runs, compare, load_result, save_result,
+                        format_value, COMPARED_METRICS)
 
 class ProjectRunner:
-    def __init__(self, config_file: str = "config.txt"):
+    def __init__(self, config_file: str = "config.txt", configuration: Optional[str] = None):
         self.config_file = Path(config_file)
-        self.parser = ConfigParser(config_file)
+        self.configuration = configuration
+        # Дерево сборки лежит рядом с config.txt (в рабочей области - в папке участника)
+        self.root_build_dir = self.config_file.parent / "build"
+        self.parser = ConfigParser(config_file, cache_file=self.root_build_dir / ".crystxx_config.json")
+        self.build_dir = self.root_build_dir / configuration if configuration else self.root_build_dir
         
-    def run(self) -> bool:
-        """Запускает проект"""
+    def run(self, executor: Optional[str] = None) -> bool:
+        """Запускает исполнитель проекта (по умолчанию - одноимённый проекту или первый)"""
         try:
-            config = self.parser.parse()
-            
-            build_dir = Path("build")
-            executable = build_dir / config['project']['name']
-            
-            # Для Windows добавляем .exe если нужно
-            if not executable.exists():
-                executable = executable.with_suffix(".exe")
-            
-            if not executable.exists():
-                print(f"Executable not found: {executable}")
-                print("Please build the project first with: crystxx --build")
+            executable = self._find_executable(executor)
+            if not executable:
                 return False
             
             print(f"Running: {executable}")
@@ -32,4 +30,111 @@ class ProjectRunner:
             
         except Exception as e:
             print(f"Run error: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def bench(self, executor: Optional[str] = None, runs: int = 10, warmup: int = 1,
+              baseline: Optional[str] = None, threshold: float = 5.0) -> bool:
+        """Запускает исполнитель runs раз после warmup прогонов и сравнивает с базовым результатом"""
+        try:
+            executable = self._find_executable(executor)
+            if not executable:
+                return False
+            
+            name = executable.name.removesuffix(".exe")
+            print(f"Benchmarking: {executable} ({runs} run(s), {warmup} warmup)")
+            samples = []
+            for i in range(warmup + runs):
+                sample = measure_run([str(executable)])
+                if sample['returncode'] != 0:
+                    print(f"Run {i + 1} failed with exit code {sample['returncode']}")
+                    return False
+                # Прогревочные запуски (кэши ОС, страницы бинарника) не учитываются
+                if i >= warmup:
+                    samples.append(sample)
+            
+            result = {
+                'executor': name,
+                'configuration': self.configuration,
+                'executable': str(executable),
+                'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                'runs': runs,
+                'warmup': warmup,
+                'summary': summarize_runs(samples),
+                'samples': samples
+            }
+            self._print_summary(result)
+            
+            result_file = self.build_dir / "bench" / f"{name}.json"
+            baseline_file = self._baseline_file(name, baseline) if baseline else result_file
+            previous = load_result(baseline_file)
+            if baseline and previous is None:
+                print(f"Warning: no benchmark results in {baseline_file}")
+            save_result(result_file, result)
+            print(f"Results written to: {result_file}")
+            
+            if previous is None:
+                return True
+            return self._print_comparison(result, previous, baseline_file, threshold)
+            
+        except Exception as e:
+            print(f"Run error: {e}")
+            return False
+    
+    def _baseline_file(self, name: str, baseline: str) -> Path:
+        """Базовый результат: путь к JSON или имя профиля сборки (default - дерево build/)"""
+        if baseline.endswith(".json") or Path(baseline).is_file():
+            return Path(baseline)
+        build_dir = self.root_build_dir if baseline == "default" else self.root_build_dir / baseline
+        return build_dir / "bench" / f"{name}.json"
+    
+    def _print_summary(self, result: Dict[str, Any]):
+        print(f"{'metric':<22} {'mean':>10} {'median':>10} {'p95':>10} {'p99':>10} {'stdev':>10}")
+        for metric, stats in result['summary'].items():
+            values = [format_value(metric, stats[key]) for key in ('mean', 'median', 'p95', 'p99', 'stdev')]
+            print(f"{metric:<22} " + " ".join(f"{value:>10}" for value in values))
+    
+    def _print_comparison(self, result: Dict[str, Any], baseline: Dict[str, Any], baseline_file: Path,
+                          threshold: float) -> bool:
+        """Печатает изменение медиан; False - если есть регрессия больше порога"""
+        print(f"Compared with {baseline_file} ({baseline.get('timestamp', 'unknown time')}), "
+              f"threshold {threshold:g}%:")
+        rows = compare(result, baseline, threshold)
+        for row in rows:
+            verdict = "  REGRESSION" if row['regression'] else ""
+            print(f"  {COMPARED_METRICS[row['metric']]} median: {format_value(row['metric'], row['baseline'])} -> "
+                  f"{format_value(row['metric'], row['current'])} ({row['change']:+.1f}%){verdict}")
+        if any(row['regression'] for row in rows):
+            print("Performance regression detected!")
+            return False
+        return True
+    
+    def _find_executable(self, executor: Optional[str]) -> Optional[Path]:
+        """Находит собранный исполнитель или объясняет, как его собрать"""
+        config = self.parser.parse()
+        executable = self.build_dir / self._select_executor(config, executor)
+        
+        # Для Windows добавляем .exe если нужно
+        if not executable.exists():
+            executable = executable.with_suffix(".exe")
+        
+        if not executable.exists():
+            print(f"Executable not found: {executable}")
+            if self.configuration:
+                print(f"Please build the project first with: crystxx --build --config {self.configuration}")
+            else:
+                print("Please build the project first with: crystxx --build")
+            return None
+        return executable
+    
+    def _select_executor(self, config: Dict[str, Any], executor: Optional[str]) -> str:
+        """Выбирает имя запускаемого исполнителя"""
+        names = [e['name'] for e in config['executors']]
+        if executor:
+            if executor not in names:
+                raise ValueError(f"Unknown executor '{executor}', available: {', '.join(names)}")
+            return executor
+        
+        project_name = config['project']['name']
+        if project_name in names or not names:
+            return project_name
+        return names[0]
\ No newline at end of file
@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+import os
+import threading
+import time
+
+
+class JobResult:
+    """Результат выполнения задачи сборки"""
+
+    def __init__(self, success: bool, output: str = "", skipped: bool = False):
+        self.success = success
+        self.output = output
+        # skipped - задача не выполнялась, так как артефакт актуален
+        self.skipped = skipped
+        self.duration = 0.0
+        # Момент запуска (perf_counter) и поток пула - для профилирования
+        self.start: Optional[float] = None
+        self.worker = ""
+
+
+class Job:
+    """Задача сборки (компиляция, линковка и т.п.) с зависимостями"""
+
+    def __init__(self, name: str, action: Callable[['Job'], JobResult],
+                 deps: Optional[List['Job']] = None, kind: str = "compile",
+                 description: str = ""):
+        self.name = name
+        self.action = action
+        self.deps = deps or []
+        self.kind = kind
+        self.description = description or name
+        self.result: Optional[JobResult] = None
+
+
+class JobScheduler:
+    """Выполняет граф задач в пуле из N параллельных процессов"""
+
+    def __init__(self, jobs: Optional[int] = None, keep_going: bool = False):
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.keep_going = keep_going
+
+    def run(self, jobs: List[Job]) -> bool:
+        """Запускает задачи с учётом зависимостей, возвращает True если все успешны"""
+        pending = list(jobs)
+        running: Dict = {}
+        failed = False
+        finished = 0
+        total = len(jobs)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while True:
+                # После первой ошибки новые задачи не запускаем (если не --keep-going)
+                if not failed or self.keep_going:
+                    pending = self._submit_ready(pool, pending, running)
+
+                if not running:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    job.result = self._collect(future)
+                    finished += 1
+                    self._report(job, finished, total)
+                    if not job.result.success:
+                        failed = True
+
+        return not failed and all(job.result is not None and job.result.success for job in jobs)
+
+    def _submit_ready(self, pool: ThreadPoolExecutor, pending: List[Job], running: Dict) -> List[Job]:
+        """Отправляет в пул задачи, все зависимости которых выполнены"""
+        still_pending = []
+        for job in pending:
+            if any(dep.result is not None and not dep.result.success for dep in job.deps):
+                # Зависимость упала - задача выполнена быть не может
+                job.result = JobResult(False)
+                continue
+
+            ready = all(dep.result is not None for dep in job.deps)
+            if ready and len(running) < self.jobs:
+                running[pool.submit(self._execute, job)] = job
+            else:
+                still_pending.append(job)
+        return still_pending
+
+    def _execute(self, job: Job) -> JobResult:
+        """Выполняет задачу и замеряет время"""
+        start = time.perf_counter()
+        result = job.action(job)
+        result.start = start
+        result.duration = time.perf_counter() - start
+        result.worker = threading.current_thread().name
+        return result
+
+    def _collect(self, future) -> JobResult:
+        """Извлекает результат задачи, превращая исключение в ошибку"""
+        try:
+            return future.result()
+        except Exception as e:
+            return JobResult(False, f"Internal error: {e}")
+
+    def _report(self, job: Job, finished: int, total: int):
+        """Печатает результат задачи сразу после её завершения"""
+        result = job.result
+        if result.skipped:
+            return
+
+        print(f"[{finished}/{total}] {job.description}")
+        if result.output:
+            print(result.output.rstrip())
+        if not result.success:
+            print(f"FAILED: {job.name}")
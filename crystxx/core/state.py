@@ -0,0 +1,64 @@
+from pathlib import Path
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import os
+import threading
+
+
+def compute_signature(data: Any) -> str:
+    """Вычисляет стабильную сигнатуру для сериализуемых данных"""
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def file_stamp(path: Path) -> Optional[list]:
+    """Возвращает отметку файла (mtime, размер) или None если файла нет"""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class BuildState:
+    """Хранит сигнатуры собранных артефактов между запусками"""
+
+    def __init__(self, state_file: Path):
+        self.state_file = Path(state_file)
+        self.entries: Dict[str, str] = {}
+        # Задачи сборки обновляют состояние из нескольких потоков
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Загружает состояние с диска"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        """Атомарно сохраняет состояние на диск"""
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.state_file.with_name(self.state_file.name + '.tmp')
+        with self._lock:
+            entries = dict(self.entries)
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'entries': entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.state_file)
+
+    def is_up_to_date(self, output: Path, signature: str) -> bool:
+        """Проверяет что артефакт существует и собран с той же сигнатурой"""
+        return output.exists() and self.entries.get(str(output)) == signature
+
+    def record(self, output: Path, signature: str):
+        """Запоминает сигнатуру успешно собранного артефакта"""
+        with self._lock:
+            self.entries[str(output)] = signature
+
+    def forget(self, output: Path):
+        """Удаляет запись об артефакте"""
+        with self._lock:
+            self.entries.pop(str(output), None)
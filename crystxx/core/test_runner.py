@@ -0,0 +1,172 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import subprocess
+import time
+
+from .config_parser import ConfigParser
+
+TIMINGS_FILE = ".crystxx_test_times.json"
+
+# Время теста без замеров: такие тесты считаются средними
+DEFAULT_DURATION = 1.0
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Разбирает --shard i/n (i от 1 до n)"""
+    index, _, count = spec.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/n, e.g. 1/4")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}', index must be between 1 and {max(count, 1)}")
+    return index, count
+
+
+def longest_first(names: List[str], durations: Dict[str, float]) -> List[str]:
+    """Сортирует тесты по убыванию времени, при равенстве - по имени"""
+    known = [durations[name] for name in names if name in durations]
+    default = sum(known) / len(known) if known else DEFAULT_DURATION
+    return sorted(names, key=lambda name: (-durations.get(name, default), name))
+
+
+def assign_shards(names: List[str], durations: Dict[str, float], count: int) -> List[List[str]]:
+    """Делит тесты на count частей с близким суммарным временем: длинные - в наименее занятую часть"""
+    known = [durations[name] for name in names if name in durations]
+    default = sum(known) / len(known) if known else DEFAULT_DURATION
+    shards: List[List[str]] = [[] for _ in range(count)]
+    totals = [0.0] * count
+    for name in longest_first(names, durations):
+        # Детерминировано: при равной загрузке выбирается часть с меньшим номером
+        shard = min(range(count), key=lambda i: (totals[i], i))
+        shards[shard].append(name)
+        totals[shard] += durations.get(name, default)
+    return shards
+
+
+class TestResult:
+    """Результат запуска одного теста"""
+
+    def __init__(self, name: str, status: str, duration: float, output: str = ""):
+        self.name = name
+        # passed, failed, timeout или missing (бинарник не собран)
+        self.status = status
+        self.duration = duration
+        self.output = output
+
+
+class TestRunner:
+    """Запускает тесты CREATE_TEST параллельно, длинные - первыми"""
+
+    def __init__(self, config_file: str = "config.txt", jobs: Optional[int] = None,
+                 configuration: Optional[str] = None, timeout: Optional[float] = None,
+                 shard: Optional[str] = None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.timeout = timeout
+        self.shard = shard
+        root_build_dir = Path(config_file).parent / "build"
+        self.parser = ConfigParser(config_file, cache_file=root_build_dir / ".crystxx_config.json")
+        build_dir = root_build_dir / configuration if configuration else root_build_dir
+        self.test_dir = build_dir / "tests"
+        self.timings_file = build_dir / TIMINGS_FILE
+        self.durations: Dict[str, float] = {}
+
+    def select(self, names: Optional[List[str]] = None) -> Optional[List[str]]:
+        """Выбирает тесты для запуска (все или перечисленные) и оставляет только свою часть --shard"""
+        try:
+            config = self.parser.parse()
+            available = [test['name'] for test in config.get('tests', [])]
+            unknown = [name for name in names or [] if name not in available]
+            if unknown:
+                raise ValueError(f"Unknown test(s): {', '.join(unknown)}, "
+                                 f"available: {', '.join(available) or '-'}")
+            selected = [name for name in available if not names or name in names]
+
+            self._load_timings()
+            if self.shard:
+                index, count = parse_shard(self.shard)
+                selected = assign_shards(selected, self.durations, count)[index - 1]
+                print(f"Shard {index}/{count}: {len(selected)} test(s)")
+            return selected
+
+        except Exception as e:
+            print(f"Test error: {e}")
+            return None
+
+    def run(self, names: List[str]) -> bool:
+        """Запускает тесты и сохраняет их время для следующего планирования"""
+        ordered = longest_first(names, self.durations)
+        jobs = min(self.jobs, len(ordered)) or 1
+        print(f"Running {len(ordered)} test(s) using {jobs} parallel job(s)")
+
+        start = time.perf_counter()
+        results: List[TestResult] = []
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(self._run_test, name) for name in ordered]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"[{len(results)}/{len(ordered)}] {result.status.upper()} {result.name} "
+                      f"({result.duration:.2f}s)")
+                if result.status != "passed" and result.output:
+                    print(result.output)
+
+        self._save_timings(results)
+
+        failed = [result for result in results if result.status != "passed"]
+        timed_out = sum(1 for result in failed if result.status == "timeout")
+        summary = f"Tests: {len(results) - len(failed)} passed, {len(failed)} failed"
+        if timed_out:
+            summary += f" ({timed_out} timed out)"
+        print(f"{summary} in {time.perf_counter() - start:.2f}s")
+        for result in sorted(failed, key=lambda result: result.name):
+            print(f"  {result.status.upper()}: {result.name}")
+        return not failed
+
+    def _executable(self, name: str) -> Optional[Path]:
+        for path in (self.test_dir / name, (self.test_dir / name).with_suffix(".exe")):
+            if path.exists():
+                return path
+        return None
+
+    def _run_test(self, name: str) -> TestResult:
+        """Запускает один тест с ограничением по времени"""
+        executable = self._executable(name)
+        if not executable:
+            return TestResult(name, "missing", 0.0, f"Test executable not found in {self.test_dir}")
+
+        start = time.perf_counter()
+        try:
+            result = subprocess.run([str(executable)], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    text=True, errors='replace', timeout=self.timeout)
+        except subprocess.TimeoutExpired as e:
+            output = e.output.decode(errors='replace') if isinstance(e.output, bytes) else e.output or ""
+            return TestResult(name, "timeout", time.perf_counter() - start,
+                              (output + f"\nTimed out after {self.timeout:g}s").strip())
+
+        status = "passed" if result.returncode == 0 else "failed"
+        output = result.stdout.strip()
+        if status == "failed":
+            output = (output + f"\nExit code: {result.returncode}").strip()
+        return TestResult(name, status, time.perf_counter() - start, output)
+
+    def _load_timings(self):
+        try:
+            with open(self.timings_file, 'r', encoding='utf-8') as f:
+                self.durations = {name: float(value) for name, value in json.load(f).get('tests', {}).items()}
+        except (OSError, ValueError, AttributeError):
+            self.durations = {}
+
+    def _save_timings(self, results: List[TestResult]):
+        """Атомарно дописывает время прогнанных тестов; время остальных (других частей) сохраняется"""
+        for result in results:
+            if result.status != "missing":
+                self.durations[result.name] = round(result.duration, 4)
+        self.timings_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.timings_file.with_name(self.timings_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'tests': dict(sorted(self.durations.items()))}, f, indent=1)
+        os.replace(tmp_file, self.timings_file)
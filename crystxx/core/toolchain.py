@@ -0,0 +1,171 @@
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+import json
+import os
+import shutil
+import subprocess
+
+# Флаги, поддержку которых проверяем один раз для каждого компилятора
+PROBED_FLAGS = [
+    "-fdiagnostics-format=json",
+    "-ftime-trace",
+    "-flto",
+    "-flto=thin",
+    "-fprofile-generate",
+    "-fprofile-instr-generate",
+    "-Winvalid-pch",
+]
+
+# Версия формата записей - увеличивается при изменении набора проверок
+TOOLCHAIN_CACHE_VERSION = 1
+
+
+def default_cache_file() -> Path:
+    """Возвращает пользовательский файл кэша компиляторов"""
+    if os.name == 'nt' and os.environ.get("LOCALAPPDATA"):
+        base = Path(os.environ["LOCALAPPDATA"])
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / "crystxx" / "toolchains.json"
+
+
+class Toolchain:
+    """Результаты проверки компилятора: путь, версия, целевая платформа и возможности"""
+
+    def __init__(self, name: str, path: str, version: str = "", target: str = "",
+                 include_paths: Optional[List[str]] = None, supported_flags: Optional[List[str]] = None,
+                 identity: str = ""):
+        self.name = name
+        self.path = path
+        self.version = version
+        self.target = target
+        self.include_paths = include_paths or []
+        self.supported_flags = supported_flags or []
+        self.identity = identity
+
+    @property
+    def is_msvc(self) -> bool:
+        return Path(self.name).stem.lower() in ["cl", "clang-cl"]
+
+    @property
+    def is_clang(self) -> bool:
+        return "clang" in Path(self.name).name.lower()
+
+    def supports(self, flag: str) -> bool:
+        """Проверяет, поддерживает ли компилятор флаг"""
+        return flag in self.supported_flags
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'path': self.path,
+            'version': self.version,
+            'target': self.target,
+            'include_paths': self.include_paths,
+            'supported_flags': self.supported_flags,
+            'identity': self.identity
+        }
+
+
+class ToolchainCache:
+    """Кэш результатов проверки компиляторов, ключ - путь и mtime бинарника"""
+
+    def __init__(self, cache_file: Optional[Path] = None):
+        self.cache_file = Path(cache_file) if cache_file else default_cache_file()
+        self.entries: Optional[Dict[str, Any]] = None
+
+    def resolve(self, compiler: str) -> Optional[Toolchain]:
+        """Находит компилятор и возвращает его описание (без запуска процессов на тёплом кэше)"""
+        found = shutil.which(compiler)
+        if not found:
+            return None
+
+        path = os.path.realpath(found)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        key = f"{compiler}|{path}|{stat.st_mtime_ns}|{stat.st_size}"
+        entries = self._load()
+        if key in entries:
+            return Toolchain(**entries[key])
+
+        toolchain = self._probe(compiler, path, key)
+        # Записи для старых версий того же бинарника больше не нужны
+        for old_key in [k for k in entries if k.startswith(f"{compiler}|{path}|")]:
+            del entries[old_key]
+        entries[key] = toolchain.to_dict()
+        self._save()
+        return toolchain
+
+    def _load(self) -> Dict[str, Any]:
+        if self.entries is None:
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                valid = data.get('version') == TOOLCHAIN_CACHE_VERSION
+                self.entries = data.get('toolchains', {}) if valid else {}
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    def _save(self):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': TOOLCHAIN_CACHE_VERSION, 'toolchains': self.entries}, f, indent=1)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            # Кэш - только ускорение, без него всё работает
+            pass
+
+    def _probe(self, compiler: str, path: str, identity: str) -> Toolchain:
+        """Запускает компилятор и собирает сведения о нём"""
+        toolchain = Toolchain(compiler, path, identity=identity)
+        if toolchain.is_msvc and not toolchain.is_clang:
+            # cl печатает версию в баннере при запуске без аргументов
+            banner = self._run([path])
+            toolchain.version = banner.splitlines()[0] if banner else ""
+            toolchain.include_paths = [p for p in os.environ.get("INCLUDE", "").split(os.pathsep) if p]
+            return toolchain
+
+        version = self._run([path, "--version"])
+        toolchain.version = version.splitlines()[0] if version else ""
+        toolchain.target = self._run([path, "-dumpmachine"]).strip()
+        toolchain.include_paths = self._probe_include_paths(path, compiler)
+        toolchain.supported_flags = [flag for flag in PROBED_FLAGS if self._accepts_flag(path, flag)]
+        return toolchain
+
+    def _probe_include_paths(self, path: str, compiler: str) -> List[str]:
+        """Извлекает системные include пути из вывода -E -v"""
+        language = "c++" if "++" in compiler else "c"
+        output = self._run([path, "-x", language, "-E", "-v", "-"])
+        include_paths = []
+        collecting = False
+        for line in output.splitlines():
+            if line.startswith("#include <...> search starts here:"):
+                collecting = True
+            elif line.startswith("End of search list."):
+                break
+            elif collecting:
+                include_paths.append(line.strip().replace(" (framework directory)", ""))
+        return include_paths
+
+    def _accepts_flag(self, path: str, flag: str) -> bool:
+        """Проверяет флаг компиляцией пустого файла"""
+        try:
+            result = subprocess.run([path, flag, "-Werror", "-x", "c", "-c", "-", "-o", os.devnull],
+                                    input="", capture_output=True, text=True)
+        except OSError:
+            return False
+        return result.returncode == 0
+
+    def _run(self, cmd: List[str]) -> str:
+        """Запускает команду и возвращает объединённый вывод"""
+        try:
+            result = subprocess.run(cmd, input="", capture_output=True, text=True)
+        except OSError:
+            return ""
+        return result.stdout + result.stderr
@@ -0,0 +1,76 @@
+from pathlib import Path
+from typing import Dict, List
+import json
+import os
+
+
+class UnityBatcher:
+    """Группирует исходники библиотек в unity-файлы со стабильным распределением"""
+
+    def __init__(self, unity_dir: Path, batch_size: int):
+        self.unity_dir = Path(unity_dir)
+        self.batch_size = max(1, batch_size)
+        self.state_file = self.unity_dir / "batches.json"
+        self.batches: Dict[str, List[List[str]]] = {}
+
+    def load(self):
+        """Загружает распределение файлов с прошлой сборки"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+
+        # При изменении размера пакета распределяем файлы заново
+        if data.get('batch_size') == self.batch_size:
+            self.batches = data.get('batches', {})
+        else:
+            self.batches = {}
+
+    def save(self):
+        """Сохраняет распределение файлов"""
+        self.unity_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.state_file.with_name(self.state_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'batch_size': self.batch_size, 'batches': self.batches}, f, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.state_file)
+
+    def assign(self, target_name: str, sources: List[Path]) -> List[List[Path]]:
+        """Распределяет исходники по пакетам, сохраняя прежние назначения"""
+        current = [str(source) for source in sorted(sources)]
+        current_set = set(current)
+
+        # Удалённые файлы убираем, но номера пакетов не сдвигаем - иначе
+        # переименуются все последующие unity-файлы и пересоберётся вся библиотека
+        batches = [[source for source in batch if source in current_set]
+                   for batch in self.batches.get(target_name, [])]
+        assigned = {source for batch in batches for source in batch}
+
+        for source in current:
+            if source in assigned:
+                continue
+            for batch in batches:
+                if len(batch) < self.batch_size:
+                    batch.append(source)
+                    break
+            else:
+                batches.append([source])
+
+        self.batches[target_name] = batches
+        return [[Path(source) for source in batch] for batch in batches]
+
+    def write_unity_files(self, target_name: str, sources: List[Path], extension: str) -> List[Path]:
+        """Генерирует build/unity/<цель>_<k> файлы и возвращает их пути"""
+        unity_files = []
+        for index, batch in enumerate(self.assign(target_name, sources)):
+            if not batch:
+                continue
+
+            unity_file = self.unity_dir / f"{target_name}_{index}{extension}"
+            content = ''.join(f'#include "{source.as_posix()}"\n' for source in batch)
+            # Перезаписываем только изменившиеся файлы, чтобы не сбивать их отметки
+            if not unity_file.exists() or unity_file.read_text(encoding='utf-8') != content:
+                unity_file.parent.mkdir(parents=True, exist_ok=True)
+                unity_file.write_text(content, encoding='utf-8')
+            unity_files.append(unity_file.resolve())
+        return unity_files
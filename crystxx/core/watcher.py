@@ -0,0 +1,199 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# Файлы, изменения которых влияют на сборку
+WATCHED_EXTENSIONS = ('.c', '.cpp', '.cc', '.cxx', '.h', '.hpp', '.hh', '.hxx', '.inl', '.ipp', '.tpp')
+
+# Константы inotify из <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class FileWatcher:
+    """Следит за исходниками, заголовками и конфигом проекта"""
+
+    def __init__(self, roots: List[Path], config_file: Path, ignored_dirs: List[Path]):
+        self.roots = [Path(root).resolve() for root in roots]
+        self.config_file = Path(config_file).resolve()
+        self.ignored_dirs = {Path(d).resolve() for d in ignored_dirs}
+
+    def is_relevant(self, path: Path) -> bool:
+        """Проверяет, влияет ли файл на сборку"""
+        return path == self.config_file or path.suffix.lower() in WATCHED_EXTENSIONS
+
+    def is_ignored_dir(self, path: Path) -> bool:
+        """Папки сборки и скрытые папки не отслеживаются"""
+        return path.name.startswith('.') or path in self.ignored_dirs
+
+    def iter_dirs(self):
+        """Обходит все отслеживаемые папки"""
+        seen: Set[Path] = set()
+        stack = list(self.roots)
+        while stack:
+            directory = stack.pop()
+            if directory in seen or not directory.is_dir():
+                continue
+            seen.add(directory)
+            yield directory
+            try:
+                for entry in os.scandir(directory):
+                    if entry.is_dir(follow_symlinks=False):
+                        child = Path(entry.path)
+                        if not self.is_ignored_dir(child):
+                            stack.append(child)
+            except OSError:
+                continue
+
+    def wait(self, timeout: Optional[float] = None) -> List[Tuple[str, Path]]:
+        """Ждёт изменений и возвращает список (тип, путь), тип - modified/created/deleted"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(FileWatcher):
+    """Отслеживание через inotify (Linux)"""
+
+    def __init__(self, roots: List[Path], config_file: Path, ignored_dirs: List[Path]):
+        super().__init__(roots, config_file, ignored_dirs)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: Dict[int, Path] = {}
+        for directory in self.iter_dirs():
+            self._add_watch(directory)
+        # Конфиг может лежать вне отслеживаемых папок
+        self._add_watch(self.config_file.parent)
+
+    def _add_watch(self, directory: Path):
+        if directory in self._watches.values():
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(directory)), WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = directory
+
+    def wait(self, timeout: Optional[float] = None) -> List[Tuple[str, Path]]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+
+        changes: List[Tuple[str, Path]] = []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changes
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if directory is None or not name:
+                continue
+
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not self.is_ignored_dir(path):
+                    # Новая папка: подписываемся на неё и считаем её файлы созданными
+                    for sub_dir in FileWatcher([path], self.config_file, list(self.ignored_dirs)).iter_dirs():
+                        self._add_watch(sub_dir)
+                    changes.append(("created", path))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changes.append(("deleted", path))
+                continue
+
+            if not self.is_relevant(path):
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                changes.append(("created", path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                changes.append(("deleted", path))
+            else:
+                changes.append(("modified", path))
+        return changes
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingWatcher(FileWatcher):
+    """Запасной вариант: периодическое сравнение mtime файлов"""
+
+    def __init__(self, roots: List[Path], config_file: Path, ignored_dirs: List[Path],
+                 interval: float = 0.5):
+        super().__init__(roots, config_file, ignored_dirs)
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[Path, int]:
+        snapshot: Dict[Path, int] = {}
+        for directory in self.iter_dirs():
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                path = Path(entry.path)
+                if entry.is_file() and self.is_relevant(path):
+                    snapshot[path] = entry.stat().st_mtime_ns
+        try:
+            snapshot[self.config_file] = self.config_file.stat().st_mtime_ns
+        except OSError:
+            pass
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> List[Tuple[str, Path]]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._take_snapshot()
+            changes = [("created", path) for path in snapshot if path not in self._snapshot]
+            changes += [("deleted", path) for path in self._snapshot if path not in snapshot]
+            changes += [("modified", path) for path, mtime in snapshot.items()
+                        if path in self._snapshot and self._snapshot[path] != mtime]
+            self._snapshot = snapshot
+            if changes:
+                return changes
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            time.sleep(self.interval if deadline is None else
+                       max(0.0, min(self.interval, deadline - time.monotonic())))
+
+
+def create_watcher(roots: List[Path], config_file: Path, ignored_dirs: List[Path]) -> FileWatcher:
+    """Создаёт inotify-наблюдатель на Linux, иначе - опрашивающий"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots, config_file, ignored_dirs)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots, config_file, ignored_dirs)
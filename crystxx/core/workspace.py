@@ -0,0 +1,185 @@
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Set
+
+from .builder import ProjectBuilder, report_built
+from .config_parser import PROJECT_LIBRARY_SEPARATOR
+from .diagnostics import DiagnosticsReporter
+from .scheduler import Job, JobScheduler
+
+WORKSPACE_FILE = "workspace.txt"
+
+
+def parse_workspace(workspace_file: Path) -> tuple[str, List[Path]]:
+    """Разбирает workspace.txt: WORKSPACE имя и MEMBER пути к папкам проектов"""
+    name = workspace_file.resolve().parent.name
+    members: List[Path] = []
+    for line in workspace_file.read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        parts = line.split()
+        command = parts[0].upper()
+        if command == "WORKSPACE" and len(parts) > 1:
+            name = parts[1]
+        elif command == "MEMBER":
+            # Пути участников - относительно папки workspace.txt
+            members.extend(workspace_file.parent / path for path in parts[1:])
+    return name, members
+
+
+def project_dependencies(config: Dict[str, Any]) -> Set[str]:
+    """Библиотеки других проектов ('проект:библиотека'), которые использует проект"""
+    dependencies = set()
+    for target in config['executors'] + config.get('tests', []) + list(config['libraries'].values()):
+        dependencies.update(dep for dep in target.get('dependencies', []) if PROJECT_LIBRARY_SEPARATOR in dep)
+    return dependencies
+
+
+class WorkspaceBuilder:
+    """Собирает проекты рабочей области одним общим пулом задач"""
+
+    def __init__(self, workspace_file: str = WORKSPACE_FILE, jobs: Optional[int] = None,
+                 keep_going: bool = False, configuration: Optional[str] = None,
+                 projects: Optional[List[str]] = None, output_format: str = "text"):
+        self.workspace_file = Path(workspace_file)
+        self.jobs = jobs
+        self.keep_going = keep_going
+        self.configuration = configuration
+        # Проекты для выборочной сборки (None - все участники) - вместе с проектами, от которых зависят
+        self.projects = projects
+        self.name = ""
+        # Один поток диагностик на все проекты
+        self.diagnostics = DiagnosticsReporter(output_format)
+        self.members: Dict[str, ProjectBuilder] = {}
+        self.dependencies: Dict[str, Set[str]] = {}
+
+    def build(self) -> bool:
+        """Планирует задачи всех проектов в порядке зависимостей и выполняет их в одном пуле"""
+        try:
+            order = self._resolve_projects()
+            print(f"Building workspace: {self.name} ({len(order)} project(s))")
+
+            jobs: List[Job] = []
+            target_jobs: List[Job] = []
+            planned = []
+            exported: Dict[str, Dict[str, Any]] = {}
+            for project in order:
+                builder = self.members[project]
+                # Библиотеки уже спланированных проектов: их задачи становятся зависимостями линковки
+                builder.imports = exported
+                member = builder.plan("Planning project")
+                if not member:
+                    return False
+                member_jobs, member_targets, targets = member
+                exported.update(builder.exported_libraries(targets, member_targets))
+                planned.append((builder, member_jobs))
+                jobs.extend(member_jobs)
+                target_jobs.extend(member_targets.values())
+
+            scheduler = JobScheduler(self.jobs, self.keep_going)
+            print(f"Using {scheduler.jobs} parallel job(s) for {len(jobs)} job(s)")
+            success = False
+            try:
+                success = scheduler.run(jobs)
+            finally:
+                # Каждый проект хранит своё состояние; упавший проект не чистит свои артефакты
+                for builder, member_jobs in planned:
+                    builder.save_build(member_jobs, all(job.result and job.result.success for job in member_jobs))
+
+            self.diagnostics.finish(success)
+            if success:
+                report_built(jobs, target_jobs)
+            return success
+
+        except Exception as e:
+            print(f"Build error: {e}")
+            return False
+
+    def clean(self, gc: bool = False, max_size: Optional[int] = None) -> bool:
+        """Очищает деревья сборки всех проектов рабочей области"""
+        try:
+            self._load_members()
+        except Exception as e:
+            print(f"Clean error: {e}")
+            return False
+
+        success = True
+        for project, builder in self.members.items():
+            print(f"Cleaning project: {project}")
+            success = builder.clean(gc=gc, max_size=max_size) and success
+        return success
+
+    def _load_members(self):
+        """Создаёт сборщик каждого участника; имя проекта берётся из его config.txt"""
+        if not self.workspace_file.exists():
+            raise FileNotFoundError(f"Workspace file {self.workspace_file} not found")
+        self.name, paths = parse_workspace(self.workspace_file)
+        if not paths:
+            raise ValueError(f"No MEMBER projects in {self.workspace_file}")
+
+        self.members = {}
+        self.dependencies = {}
+        for path in paths:
+            # ninja собирает один проект - рабочая область всегда планирует задачи сама
+            builder = ProjectBuilder(config_file=str(path / "config.txt"), jobs=self.jobs,
+                                     keep_going=self.keep_going, configuration=self.configuration, ninja=False)
+            builder.diagnostics = self.diagnostics
+            config = builder.parser.parse()
+            project = config['project']['name']
+            if not project:
+                raise ValueError(f"Project in {path} has no name")
+            if project in self.members:
+                raise ValueError(f"Duplicate project name '{project}' in {path}")
+            self.members[project] = builder
+            self.dependencies[project] = project_dependencies(config)
+
+    def _resolve_projects(self) -> List[str]:
+        """Проекты в порядке зависимостей; библиотеки, нужные другим проектам, помечаются для сборки"""
+        self._load_members()
+
+        for project, dependencies in self.dependencies.items():
+            for dependency in sorted(dependencies):
+                provider, _, library = dependency.partition(PROJECT_LIBRARY_SEPARATOR)
+                if provider not in self.members:
+                    raise ValueError(f"Project '{project}' uses '{dependency}', but '{provider}' "
+                                     f"is not a workspace member")
+                if library not in self.members[provider].parser.config['libraries']:
+                    raise ValueError(f"Project '{project}' uses unknown library '{library}' of '{provider}'")
+
+        order: List[str] = []
+        # 1 - проект в текущем пути обхода, 2 - полностью обработан
+        state: Dict[str, int] = {}
+        path: List[str] = []
+
+        def visit(project: str):
+            state[project] = 1
+            path.append(project)
+            for dependency in sorted(self._project_edges(project)):
+                if state.get(dependency) == 1:
+                    cycle = path[path.index(dependency):] + [dependency]
+                    raise ValueError(f"Project dependency cycle: {' -> '.join(cycle)}")
+                if dependency not in state:
+                    visit(dependency)
+            path.pop()
+            state[project] = 2
+            order.append(project)
+
+        if self.projects:
+            unknown = [name for name in self.projects if name not in self.members]
+            if unknown:
+                raise ValueError(f"Unknown project(s): {', '.join(unknown)}, "
+                                 f"available: {', '.join(self.members)}")
+        for project in self.projects or self.members:
+            if project not in state:
+                visit(project)
+
+        for project in order:
+            for dependency in self.dependencies[project]:
+                provider, _, library = dependency.partition(PROJECT_LIBRARY_SEPARATOR)
+                self.members[provider].exports.add(library)
+        return order
+
+    def _project_edges(self, project: str) -> Set[str]:
+        """Проекты, библиотеки которых использует project"""
+        return {dependency.partition(PROJECT_LIBRARY_SEPARATOR)[0] for dependency in self.dependencies[project]}
@@ -0,0 +1,43 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Модули crystxx импортируются как core.* (как в __main__.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "crystxx"))
+
+from core.diagnostics import DiagnosticsReporter
+
+# g++ -Wall: a.cpp -> inc/outer.h -> inc/inner.h с неиспользуемой static функцией
+NESTED_INCLUDE_WARNING = """In file included from inc/outer.h:2,
+                 from {unit}:1:
+inc/inner.h:1:13: warning: 'void unused_fn()' defined but not used [-Wunused-function]
+    1 | static void unused_fn() {{}}
+      |             ^~~~~~~~~
+"""
+
+
+class NestedIncludeDiagnosticsTest(unittest.TestCase):
+    def setUp(self):
+        self.reporter = DiagnosticsReporter()
+
+    def test_include_context_keeps_order_and_indentation(self):
+        output = NESTED_INCLUDE_WARNING.format(unit="a.cpp")
+        self.assertEqual(self.reporter.report("a.cpp", output), output.rstrip())
+
+    def test_repeat_drops_its_include_context(self):
+        self.reporter.report("a.cpp", NESTED_INCLUDE_WARNING.format(unit="a.cpp"))
+        repeat = self.reporter.report("main.cpp", NESTED_INCLUDE_WARNING.format(unit="main.cpp"))
+        self.assertEqual(repeat, "")
+        self.assertEqual(self.reporter.duplicates, 1)
+        self.assertEqual(self.reporter.counts['warning'], 1)
+
+    def test_streamed_lines_match_report(self):
+        output = NESTED_INCLUDE_WARNING.format(unit="a.cpp")
+        stream = self.reporter.unit("a.cpp")
+        for line in output.splitlines(keepends=True):
+            stream.feed(line)
+        self.assertEqual(stream.close(), output.rstrip())
+
+
+if __name__ == '__main__':
+    unittest.main()